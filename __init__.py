@@ -4,28 +4,115 @@ import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, PRINTER_PORT
-from .shui import Shui3dPrinter
+from .const import CONF_PUSH, DATA_FLEET, DOMAIN, PRINTER_PORT
+from .coordinator import STORAGE_VERSION, Shui3dPrinterCoordinator
+from .entity import unique_id
+from .services import async_setup_services
+from .shui import Shui3dPrinter, Shui3dPrinterFleet
 
 LOGGER = logging.getLogger(__name__)
-PLATFORMS = [Platform.SENSOR, Platform.BUTTON, Platform.NUMBER]
+PLATFORMS = [Platform.SENSOR, Platform.BUTTON, Platform.NUMBER, Platform.SELECT]
+
+LEGACY_DEVICE_ID = "shui_3d_printer"
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 def log(message: str):
     LOGGER.info(message)
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    async_setup_services(hass)
+
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    entry.runtime_data = Shui3dPrinter(entry.data["ip"], PRINTER_PORT, log)
+    await async_migrate_identities(hass, entry)
+
+    # One fleet per HA instance bounds concurrent updates across all printers
+    fleet: Shui3dPrinterFleet = hass.data.setdefault(DATA_FLEET, Shui3dPrinterFleet())
+
+    printer = Shui3dPrinter(
+        entry.data["ip"],
+        PRINTER_PORT,
+        log,
+        entry.data.get(CONF_PUSH, False),
+        fleet=fleet,
+    )
+
+    # Entities start from the last known state, marked stale, instead of
+    # waiting for the printer, which may well be switched off.
+    store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+    snapshot = await store.async_load()
+
+    if snapshot:
+        printer.restore(snapshot)
+
+    coordinator = Shui3dPrinterCoordinator(hass, printer, fleet, store)
+
+    # Auto reports and connection changes arrive between refreshes, hand
+    # them to the entities right away
+    entry.async_on_unload(printer.add_listener(coordinator.async_printer_updated))
+
+    entry.runtime_data = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # The first refresh runs within the fleet's startup budget without
+    # holding up the setup
+    entry.async_create_background_task(
+        hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {printer.ip()}"
+    )
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
+    if unload_ok:
+        coordinator: Shui3dPrinterCoordinator = entry.runtime_data
+        await coordinator.printer.close()
+
+        if coordinator.printer.is_connected():
+            await coordinator.store.async_save(coordinator.printer.snapshot())
+
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+
+
+async def async_migrate_identities(hass: HomeAssistant, entry: ConfigEntry):
+    # Entities and the device used to have fixed ids shared by every entry,
+    # move them under this entry's id so that several printers can coexist.
+    @callback
+    def migrate_unique_id(entity_entry: er.RegistryEntry):
+        if entity_entry.unique_id.startswith(f"{entry.entry_id}_"):
+            return None
+
+        return {"new_unique_id": unique_id(entry.entry_id, entity_entry.unique_id)}
+
+    await er.async_migrate_entries(hass, entry.entry_id, migrate_unique_id)
+
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device(
+        identifiers={(DOMAIN, LEGACY_DEVICE_ID)}
+    )
+
+    if device is not None and entry.entry_id in device.config_entries:
+        device_registry.async_update_device(
+            device.id, new_identifiers={(DOMAIN, entry.entry_id)}
+        )
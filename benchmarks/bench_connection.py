@@ -0,0 +1,176 @@
+"""Latency and throughput of the integration against the fake printer.
+
+    python benchmarks/bench_connection.py [--count 200] [--latency 0.005]
+        [--drop 0.0] [--partial 0.0] [--printers 100] [--concurrency 8]
+        [--upload-lines 5000]
+
+Measures Shui3dPrinterConnection.exec and exec_batch, Shui3dPrinter.update,
+a windowed SD upload and one fleet wide polling round, together with the
+worst event loop stall seen while the fleet was polled.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+from support import load_package
+
+load_package()
+
+from fake_printer import FakeShuiPrinter  # noqa: E402
+from shui_3d_print.shui import (  # noqa: E402
+    GCode,
+    Shui3dPrinter,
+    Shui3dPrinterConnection,
+    Shui3dPrinterFleet,
+)
+
+HOST = "127.0.0.1"
+
+
+def quiet(message: str):
+    pass
+
+
+def summary(name: str, latencies: List[float], elapsed: float):
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(
+        f"{name:<24} n={len(latencies):<5} mean={statistics.mean(latencies) * 1000:8.2f} ms "
+        f"p50={percentile(0.5):8.2f} p95={percentile(0.95):8.2f} p99={percentile(0.99):8.2f} "
+        f"{len(latencies) / elapsed:9.1f} ops/s"
+    )
+
+
+async def timed(name: str, count: int, run: Callable[[], Awaitable[None]]):
+    latencies: List[float] = []
+    started = time.perf_counter()
+
+    for _ in range(count):
+        start = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - start)
+
+    summary(name, latencies, time.perf_counter() - started)
+
+
+async def loop_lag(stop: asyncio.Event, lags: List[float]):
+    loop = asyncio.get_running_loop()
+
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - start - 0.001)
+
+
+async def bench_fleet(port: int, printers: int, concurrency: int):
+    fleet = Shui3dPrinterFleet(concurrency)
+    fleet_printers = [Shui3dPrinter(HOST, port, quiet) for _ in range(printers)]
+
+    for name in ("fleet (connect)", "fleet (persistent)"):
+        stop = asyncio.Event()
+        lags: List[float] = []
+        lag = asyncio.create_task(loop_lag(stop, lags))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(fleet.update(printer) for printer in fleet_printers))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await lag
+
+        connected = sum(printer.is_connected() for printer in fleet_printers)
+        print(
+            f"{name:<24} printers={printers} concurrency={concurrency} "
+            f"round={elapsed * 1000:8.2f} ms connected={connected} "
+            f"max loop lag={max(lags, default=0) * 1000:6.2f} ms"
+        )
+
+    for printer in fleet_printers:
+        await printer.close()
+
+
+async def bench_upload(port: int, lines: int):
+    with tempfile.NamedTemporaryFile("w", suffix=".gcode", delete=False) as file:
+        for i in range(lines):
+            file.write(f"G1 X{i % 200} Y{i % 150} E{i * 0.01:.2f} ; move {i}\n")
+
+    printer = Shui3dPrinter(HOST, port, quiet)
+
+    try:
+        start = time.perf_counter()
+        succeeded = await printer.upload(file.name, "bench.gco")
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{'upload':<24} lines={lines} window={Shui3dPrinter.UPLOAD_WINDOW} "
+            f"ok={succeeded} {elapsed * 1000:9.2f} ms "
+            f"{printer.upload_rate():10.0f} B/s {lines / elapsed:9.1f} lines/s"
+        )
+    finally:
+        await printer.close()
+        os.unlink(file.name)
+
+
+async def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--count", type=int, default=200)
+    args.add_argument("--latency", type=float, default=0.005)
+    args.add_argument("--drop", type=float, default=0.0)
+    args.add_argument("--partial", type=float, default=0.0)
+    args.add_argument("--printers", type=int, default=100)
+    args.add_argument("--concurrency", type=int, default=8)
+    args.add_argument("--upload-lines", type=int, default=5000)
+    options = args.parse_args()
+
+    fake = FakeShuiPrinter(options.latency, options.drop, options.partial, seed=0)
+    fake.start_print()
+    port = await fake.start(HOST)
+
+    connection = Shui3dPrinterConnection(HOST, port)
+
+    await timed("exec M105", options.count, lambda: connection.exec(GCode.TEMPERATURES))
+    await timed(
+        "exec x3 sequential",
+        options.count,
+        lambda: sequential(
+            connection, [GCode.SD_PRINT_STATUS, GCode.TEMPERATURES, GCode.POSITION]
+        ),
+    )
+    await timed(
+        "exec_batch x3",
+        options.count,
+        lambda: connection.exec_batch(
+            [GCode.SD_PRINT_STATUS, GCode.TEMPERATURES, GCode.POSITION]
+        ),
+    )
+
+    await connection.close()
+
+    printer = Shui3dPrinter(HOST, port, quiet)
+    await timed("Shui3dPrinter.update", options.count, printer.update)
+    await printer.close()
+
+    await bench_upload(port, options.upload_lines)
+
+    await bench_fleet(port, options.printers, options.concurrency)
+
+    print(f"fake printer: {fake.sessions} sessions, {fake.commands} commands")
+
+    await fake.stop()
+
+
+async def sequential(connection: Shui3dPrinterConnection, snippets: List[str]):
+    for snippet in snippets:
+        await connection.exec(snippet)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+"""Parser throughput over a large printer transcript.
+
+    python benchmarks/bench_parser.py [--lines N] [--transcript PATH]
+        [--capture PATH]
+
+Without --transcript a synthetic auto report stream is generated, PATH may be
+any raw byte dump of a printer session. --capture takes the received bytes of
+a session recorded with Shui3dPrinter.start_capture instead, and adds a replay
+of it through a whole Shui3dPrinter.
+"""
+
+import argparse
+import asyncio
+import random
+
+from support import load_package, measure, report
+
+load_package()
+
+from shui_3d_print.capture import RECEIVED, read_capture  # noqa: E402
+from shui_3d_print.framing import Shui3dLineBuffer  # noqa: E402
+from shui_3d_print.parser import Shui3dReportParser  # noqa: E402
+from shui_3d_print.shui import Shui3dPrinter  # noqa: E402
+
+
+CHUNKS = (64, 1460, 4096, 65536)
+
+
+def synthetic_transcript(lines: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    out = []
+    printed = 0
+
+    for i in range(lines):
+        kind = i % 4
+
+        if kind == 0:
+            out.append(
+                f" T:{200 + rng.random():.2f} /210.00 B:{59 + rng.random():.2f} "
+                f"/60.00 T0:{200 + rng.random():.2f} /210.00 @:127 B@:64"
+            )
+        elif kind == 1:
+            printed += rng.randrange(100, 2000)
+            out.append(f"SD printing byte {printed}/123456789")
+        elif kind == 2:
+            out.append("echo:busy: processing" if rng.random() < 0.2 else "ok")
+        else:
+            out.append("X:110.20 Y:95.00 Z:1.20 E:512.33 Count X:8816 Y:7600 Z:480")
+
+    return ("\n".join(out) + "\n").encode()
+
+
+def legacy(data: bytes):
+    # The line and token based parsing this parser replaced, for comparison
+    lines = data.decode().split("\n")
+
+    for line in lines:
+        parts = line.split()
+
+        for i in range(len(parts)):
+            part = parts[i]
+            if part.startswith(("T0:", "T:")):
+                float(part.split(":")[1])
+                float(parts[i + 1].split("/")[-1])
+            if part.startswith("B:"):
+                float(part.split(":")[1])
+                float(parts[i + 1].split("/")[-1])
+
+    for line in lines:
+        if "SD printing byte" in line:
+            nm = line.split()[-1].split("/")
+            float(nm[0]) / float(nm[1])
+            break
+
+    for line in lines:
+        if "busy" in line:
+            break
+
+
+def chunked(data: bytes, size: int):
+    def run():
+        parser = Shui3dReportParser()
+
+        for i in range(0, len(data), size):
+            parser.feed(data[i : i + size])
+
+    return run
+
+
+def framed(data: bytes, size: int):
+    # The connection's receive path, reads land in the line buffer and the
+    # parser scans complete lines in place
+    def run():
+        buffer = Shui3dLineBuffer()
+        view = memoryview(data)
+
+        i = 0
+
+        while i < len(data):
+            # Like a transport, never read more than the buffer offers
+            writable = buffer.writable()
+            n = min(size, len(writable), len(data) - i)
+            writable[:n] = view[i : i + n]
+            buffer.commit(n)
+            i += n
+            (start, end) = buffer.frame()
+            Shui3dReportParser.parse_range(buffer.data(), start, end)
+
+    return run
+
+
+def replayed(path: str):
+    def run():
+        printer = Shui3dPrinter("replay", 0, lambda message: None)
+        asyncio.run(printer.replay(path))
+
+    return run
+
+
+def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--lines", type=int, default=200000)
+    args.add_argument("--transcript")
+    args.add_argument("--capture")
+    args.add_argument("--repeat", type=int, default=5)
+    options = args.parse_args()
+
+    if options.capture:
+        data = b"".join(
+            payload
+            for _, kind, payload in read_capture(options.capture)
+            if kind == RECEIVED
+        )
+    elif options.transcript:
+        with open(options.transcript, "rb") as file:
+            data = file.read()
+    else:
+        data = synthetic_transcript(options.lines)
+
+    lines = data.count(b"\n")
+
+    print(f"{len(data)} bytes, {lines} lines")
+
+    runs = [
+        ("legacy split/startswith", lambda: legacy(data)),
+        ("parse (whole buffer)", lambda: Shui3dReportParser.parse(data)),
+    ]
+    runs += [(f"feed ({size} byte chunks)", chunked(data, size)) for size in CHUNKS]
+    runs += [(f"framed ({size} byte chunks)", framed(data, size)) for size in CHUNKS]
+
+    if options.capture:
+        runs.append(("replay (Shui3dPrinter)", replayed(options.capture)))
+
+    for name, run in runs:
+        report(name, measure(run, options.repeat), len(data), lines)
+
+
+if __name__ == "__main__":
+    main()
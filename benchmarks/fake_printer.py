@@ -0,0 +1,298 @@
+"""Local stand-in for the Shui / Two Trees Bluer WiFi module.
+
+    python benchmarks/fake_printer.py [--port 8080] [--latency 0.05] [--drop 0.0]
+
+Greets every session with the banner, answers the G-codes the integration
+sends with Marlin style text and can inject latency, dropped replies and
+replies split into several partial writes. Lines between M28 and M29 are
+stored as SD files and acked one by one like Marlin does, M20 lists them and
+M23 / M24 print one, M25 / M24 / M524 pause, resume and abort it. Latency
+delays every reply like a network would, replies to pipelined commands are not
+serialized behind it.
+"""
+
+import argparse
+import asyncio
+import random
+from typing import Dict, List
+
+
+class FakeShuiPrinter:
+    BANNER = [
+        "Connected to Two Trees Bluer",
+        "Shui WiFi module",
+        "FIRMWARE_NAME:Marlin",
+        "Ready",
+    ]
+
+    latency: float
+    drop: float
+    partial: float
+
+    bed_temp: float = 21.0
+    target_bed_temp: float = 0.0
+    extruder_temp: float = 21.0
+    target_extruder_temp: float = 0.0
+
+    sd_printed: int = 0
+    sd_total: int = 0
+    paused: bool = False
+
+    feedrate: int = 100
+    flow: int = 100
+
+    commands: int = 0
+    sessions: int = 0
+
+    files: Dict[str, List[str]]
+    _writing: str | None = None
+    _selected: str | None = None
+
+    _server: asyncio.AbstractServer | None = None
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        drop: float = 0.0,
+        partial: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.drop = drop
+        self.partial = partial
+        self._random = random.Random(seed)
+        self.files = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._session, host, port)
+
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_print(self, total: int = 10_000_000):
+        self.sd_printed = 0
+        self.sd_total = total
+        self.paused = False
+
+    def step(self):
+        # Heaters move toward their targets and the print advances a little
+        self.bed_temp += (max(self.target_bed_temp, 21.0) - self.bed_temp) * 0.1
+        self.extruder_temp += (
+            max(self.target_extruder_temp, 21.0) - self.extruder_temp
+        ) * 0.1
+
+        if self.sd_total and not self.paused:
+            self.sd_printed = min(self.sd_total, self.sd_printed + 4096)
+
+    def file_size(self, name: str) -> int:
+        return sum(len(line) + 1 for line in self.files[name])
+
+    def temperatures(self) -> str:
+        return (
+            f"T:{self.extruder_temp:.2f} /{self.target_extruder_temp:.2f} "
+            f"B:{self.bed_temp:.2f} /{self.target_bed_temp:.2f} "
+            f"T0:{self.extruder_temp:.2f} /{self.target_extruder_temp:.2f} @:0 B@:0"
+        )
+
+    def sd_status(self) -> str:
+        if not self.sd_total:
+            return "Not SD printing"
+
+        return f"SD printing byte {self.sd_printed}/{self.sd_total}"
+
+    def answer(self, command: str) -> List[str]:
+        parts = command.split()
+        code = parts[0].upper()
+        args = {part[0].upper(): part[1:] for part in parts[1:] if part}
+
+        self.commands += 1
+
+        if self._writing is not None:
+            if code == "M29":
+                self._writing = None
+                return ["Done saving file.", "ok"]
+
+            self.files[self._writing].append(command)
+            return ["ok"]
+
+        if code == "M28" and len(parts) > 1:
+            self._writing = parts[1].upper()
+            self.files[self._writing] = []
+            return [f"Writing to file: {self._writing}", "ok"]
+
+        if code == "M20":
+            return (
+                ["Begin file list"]
+                + [f"{name} {self.file_size(name)}" for name in sorted(self.files)]
+                + ["End file list", "ok"]
+            )
+
+        if code == "M23" and len(parts) > 1:
+            name = parts[1].upper()
+
+            if name not in self.files:
+                return [f"open failed, File: {parts[1]}.", "ok"]
+
+            self._selected = name
+            return [
+                f"File opened: {name} Size: {self.file_size(name)}",
+                "File selected",
+                "ok",
+            ]
+
+        if code == "M24" and self.paused:
+            self.paused = False
+        elif code == "M24" and self._selected is not None:
+            self.start_print(self.file_size(self._selected))
+        elif code == "M25" and self.sd_total:
+            self.paused = True
+        elif code == "M524":
+            self.sd_printed = self.sd_total = 0
+            self.paused = False
+        elif code == "M112":
+            self.sd_printed = self.sd_total = 0
+            return ["Error:Printer halted. kill() called!"]
+
+        self.step()
+
+        if code == "M105":
+            return ["ok " + self.temperatures()]
+
+        if code == "M27" and "S" not in args:
+            return [self.sd_status(), "ok"]
+
+        if code == "M114":
+            return ["X:0.00 Y:0.00 Z:0.00 E:0.00 Count X:0 Y:0 Z:0", "ok"]
+
+        if code == "M220":
+            self.feedrate = int(float(args.get("S") or self.feedrate))
+            return [f"FR:{self.feedrate}%", "ok"]
+
+        if code == "M221":
+            self.flow = int(float(args.get("S") or self.flow))
+            return [f"echo:E0 Flow: {self.flow}%", "ok"]
+
+        if code == "M140" and "S" in args:
+            self.target_bed_temp = float(args["S"])
+        elif code == "M104" and "S" in args:
+            self.target_extruder_temp = float(args["S"])
+
+        return ["ok"]
+
+    async def _write(self, writer: asyncio.StreamWriter, data: bytes):
+        if self.partial and self._random.random() < self.partial and len(data) > 1:
+            cut = self._random.randrange(1, len(data))
+            writer.write(data[:cut])
+            await writer.drain()
+            await asyncio.sleep(0.001)
+            data = data[cut:]
+
+        writer.write(data)
+        await writer.drain()
+
+    async def _report(self, replies: asyncio.Queue, interval: float, sd: bool):
+        while True:
+            await asyncio.sleep(interval)
+            self.step()
+            line = self.sd_status() if sd else " " + self.temperatures()
+            replies.put_nowait((0.0, (line + "\n").encode()))
+
+    async def _send(self, writer: asyncio.StreamWriter, replies: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            (due, data) = await replies.get()
+            delay = due - loop.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._write(writer, data)
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        replies: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = [asyncio.create_task(self._send(writer, replies))]
+
+        self.sessions += 1
+
+        try:
+            replies.put_nowait(
+                (0.0, "".join(line + "\n" for line in self.BANNER).encode())
+            )
+
+            while True:
+                data = await reader.readline()
+
+                if not data:
+                    break
+
+                command = data.decode(errors="replace").strip()
+
+                if not command:
+                    continue
+
+                if self.drop and self._random.random() < self.drop:
+                    continue
+
+                parts = command.split()
+                code = parts[0].upper()
+
+                # Auto reports, M155 S<seconds> and M27 S<seconds>
+                if code in ("M155", "M27") and len(parts) > 1:
+                    interval = float(parts[1][1:])
+
+                    if interval > 0:
+                        tasks.append(
+                            asyncio.create_task(
+                                self._report(replies, interval, code == "M27")
+                            )
+                        )
+
+                    answer = ["ok"]
+                else:
+                    answer = self.answer(command)
+
+                replies.put_nowait(
+                    (
+                        loop.time() + self.latency,
+                        "".join(line + "\n" for line in answer).encode(),
+                    )
+                )
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            writer.close()
+
+
+async def main():
+    args = argparse.ArgumentParser()
+    args.add_argument("--host", default="0.0.0.0")
+    args.add_argument("--port", type=int, default=8080)
+    args.add_argument("--latency", type=float, default=0.0)
+    args.add_argument("--drop", type=float, default=0.0)
+    args.add_argument("--partial", type=float, default=0.0)
+    args.add_argument("--printing", action="store_true")
+    options = args.parse_args()
+
+    printer = FakeShuiPrinter(options.latency, options.drop, options.partial)
+
+    if options.printing:
+        printer.start_print()
+
+    port = await printer.start(options.host, options.port)
+    print(f"Fake Shui printer listening on {options.host}:{port}")
+
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+"""Helpers shared by the benchmark scripts.
+
+The integration package imports Home Assistant from its ``__init__``, the
+protocol modules do not, so the scripts register the package without running
+its ``__init__`` and import ``shui_3d_print.shui`` and friends directly.
+"""
+
+import os
+import sys
+import time
+import types
+from typing import Callable
+
+PACKAGE = "shui_3d_print"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_package():
+    if PACKAGE in sys.modules:
+        return
+
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ROOT]
+    sys.modules[PACKAGE] = package
+
+
+def measure(run: Callable[[], None], repeat: int = 5) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def report(name: str, seconds: float, size: int, lines: int):
+    print(
+        f"{name:<28} {seconds * 1000:9.2f} ms "
+        f"{size / seconds / 1e6:9.2f} MB/s {lines / seconds / 1e6:7.2f} Mlines/s"
+    )
@@ -1,10 +1,11 @@
 from homeassistant.components.button import ButtonEntity
 from typing import Callable, Awaitable, Any
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.config_entries import ConfigEntry
-from .shui import Shui3dPrinter
-from .const import DOMAIN
+from .coordinator import Shui3dPrinterCoordinator
+from .entity import Shui3dPrinterEntity
 import logging
 
 _LOGGER = logging.getLogger(__name__)
@@ -19,50 +20,103 @@ async def async_setup_entry(
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    printer: Shui3dPrinter = config_entry.runtime_data
+    coordinator: Shui3dPrinterCoordinator = config_entry.runtime_data
 
-    if printer is None or not isinstance(printer, Shui3dPrinter):
+    if coordinator is None or not isinstance(coordinator, Shui3dPrinterCoordinator):
         _LOGGER.error(
-            "config_entry.runtime_data does not containt Shui3dPrinter instance"
+            "config_entry.runtime_data does not containt Shui3dPrinterCoordinator instance"
         )
         return
+
+    printer = coordinator.printer
+
+    def then_refresh(action: Callable[[], Awaitable[Any]]):
+        async def press():
+            result = await action()
+
+            # The print state shows with the next poll, which also moves the
+            # poll interval, ask for it without holding up the press
+            coordinator.hass.async_create_task(coordinator.async_request_refresh())
+
+            return result
+
+        return press
+
+    async def emergency_stop():
+        printer.emergency_stop()
+
     async_add_entities(
         [
             PrinterButton(
+                coordinator,
                 printer.beep,
                 "Locate printer",
                 "locate printer id",
                 "mdi:crosshairs-question",
             ),
+            PrinterButton(
+                coordinator,
+                then_refresh(printer.start_print),
+                "Start Print",
+                "start print id",
+                "mdi:play",
+            ),
+            PrinterButton(
+                coordinator,
+                then_refresh(printer.pause_print),
+                "Pause Print",
+                "pause print id",
+                "mdi:pause",
+            ),
+            PrinterButton(
+                coordinator,
+                then_refresh(printer.resume_print),
+                "Resume Print",
+                "resume print id",
+                "mdi:play-pause",
+            ),
+            PrinterButton(
+                coordinator,
+                then_refresh(printer.cancel_print),
+                "Cancel Print",
+                "cancel print id",
+                "mdi:stop",
+            ),
+            PrinterButton(
+                coordinator,
+                emergency_stop,
+                "Emergency Stop",
+                "emergency stop id",
+                "mdi:alert-octagon",
+            ),
+            PrinterButton(
+                coordinator,
+                printer.refresh_catalog,
+                "Refresh SD Files",
+                "refresh sd files id",
+                "mdi:folder-refresh-outline",
+            ),
         ]
     )
 
 
-class PrinterButton(ButtonEntity):
+class PrinterButton(Shui3dPrinterEntity, ButtonEntity):
     _icon: str
     _press: Callable[[], Awaitable[Any]]
 
     def __init__(
         self,
+        coordinator: Shui3dPrinterCoordinator,
         press: Callable[[], Awaitable[Any]],
         name: str,
         id: str,
         icon: str,
     ):
-        self._attr_unique_id = id
-        self._attr_name = name
+        super().__init__(coordinator, name, id)
         self._icon = icon
         self._press = press
 
     async def async_press(self) -> None:
-        await self._press()
-
-    @property
-    def device_info(self):
-        return {
-            "identifiers": {(DOMAIN, "shui_3d_printer")},
-            "name": "Two Trees Bluer",
-            "sw_version": "shui",
-            "model": "Bluer",
-            "manufacturer": "Two Trees",
-        }
+        # Actions report a refusal, a missing ack or no connection as False
+        if await self._press() is False:
+            raise HomeAssistantError(f"{self.name} failed")
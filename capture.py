@@ -0,0 +1,143 @@
+import asyncio
+import struct
+import time
+from typing import Callable, Iterator, Tuple
+
+# A capture is a header followed by one record per event of the session:
+# microseconds since the previous record, the kind and the payload length,
+# then the payload as it was on the wire.
+MAGIC = b"SHUICAP1"
+HEADER = struct.Struct("<8sd")
+RECORD = struct.Struct("<IBI")
+
+RECEIVED = 0
+SENT = 1
+OPENED = 2
+CLOSED = 3
+
+
+class Shui3dCaptureWriter:
+    FLUSH_SIZE = 64 * 1024
+
+    _path: str
+    _buffer: bytearray
+    _file = None
+    _flushing: asyncio.Future | None = None
+    _last: float | None = None
+
+    def __init__(self, path: str):
+        self._path = path
+        self._buffer = bytearray(HEADER.pack(MAGIC, time.time()))
+
+    def path(self) -> str:
+        return self._path
+
+    async def open(self):
+        self._file = await asyncio.get_running_loop().run_in_executor(
+            None, open, self._path, "wb"
+        )
+
+    def record(self, kind: int, data: bytes | memoryview = b""):
+        now = time.monotonic()
+        delta = 0 if self._last is None else int((now - self._last) * 1e6)
+        self._last = now
+
+        self._buffer += RECORD.pack(min(delta, 0xFFFFFFFF), kind, len(data))
+        self._buffer += data
+
+        if len(self._buffer) >= Shui3dCaptureWriter.FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        # One write at a time keeps the records in order, whatever piles up
+        # meanwhile goes out with the next one.
+        if self._flushing is not None or not self._buffer or self._file is None:
+            return
+
+        data = bytes(self._buffer)
+        self._buffer.clear()
+
+        self._flushing = asyncio.get_running_loop().run_in_executor(
+            None, self._file.write, data
+        )
+        self._flushing.add_done_callback(self._flushed)
+
+    def _flushed(self, future: asyncio.Future):
+        self._flushing = None
+
+        if len(self._buffer) >= Shui3dCaptureWriter.FLUSH_SIZE:
+            self._flush()
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+
+        while self._flushing is not None:
+            await asyncio.shield(self._flushing)
+
+        if self._file is None:
+            return
+
+        if self._buffer:
+            await loop.run_in_executor(None, self._file.write, bytes(self._buffer))
+            self._buffer.clear()
+
+        await loop.run_in_executor(None, self._file.close)
+        self._file = None
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    """Records of a capture as seconds since its start, kind and payload.
+
+    A capture cut short by a crash ends at its last complete record.
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+
+        if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+            raise ValueError(f"{path} is not a printer capture")
+
+        timestamp = 0.0
+
+        while True:
+            head = file.read(RECORD.size)
+
+            if len(head) < RECORD.size:
+                return
+
+            (delta, kind, size) = RECORD.unpack(head)
+            data = file.read(size)
+
+            if len(data) < size:
+                return
+
+            timestamp += delta / 1e6
+
+            yield (timestamp, kind, data)
+
+
+async def replay_capture(
+    path: str, feed: Callable[[bytes], None], speed: float = 0
+) -> int:
+    """Feed the received bytes of a capture, returns how many there were.
+
+    A speed of 1 keeps the recorded timing, 2 runs twice as fast and so on,
+    0 feeds everything as fast as possible.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    received = 0
+
+    for timestamp, kind, data in read_capture(path):
+        if kind != RECEIVED:
+            continue
+
+        if speed:
+            delay = started + timestamp / speed - loop.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        feed(data)
+        received += len(data)
+
+    return received
@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import logging
 import socket
-from typing import Any
+from typing import Any, Dict, List
 
 import voluptuous as vol
 from homeassistant import config_entries, exceptions
+from homeassistant.components import network
 from homeassistant.core import HomeAssistant
-from .const import DOMAIN
+from homeassistant.helpers import config_validation as cv
+from .const import CONF_PUSH, DOMAIN, PRINTER_PORT
+from .discovery import Shui3dDiscovery, network_hosts
+
+CONF_NETWORK = "network"
+CONF_PRINTERS = "printers"
 
 
 def is_valid_ip(ip: str):
@@ -19,14 +25,27 @@ def is_valid_ip(ip: str):
         return False
 
 
-DATA_SCHEMA = vol.Schema({("ip"): str})
+# Leaving the ip empty scans the network for printers instead
+DATA_SCHEMA = vol.Schema(
+    {
+        vol.Optional("ip", default=""): str,
+        vol.Optional(CONF_PUSH, default=False): bool,
+    }
+)
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
+    _push: bool = False
+    _discovered: Dict[str, str]
+
     async def async_step_user(self, user_input=None):
+        if user_input is not None and not user_input["ip"]:
+            self._push = user_input[CONF_PUSH]
+            return await self.async_step_discover()
+
         if user_input is not None and is_valid_ip(user_input["ip"]):
             return self.async_create_entry(title=user_input["ip"], data=user_input)
 
@@ -40,3 +59,102 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=DATA_SCHEMA,
             errors=errors,
         )
+
+    async def async_step_discover(self, user_input=None):
+        errors = {}
+
+        if user_input is not None:
+            try:
+                hosts = network_hosts(user_input[CONF_NETWORK])
+            except ValueError:
+                errors = {CONF_NETWORK: "Invalid network"}
+            else:
+                # Configured printers already hold a session of this
+                # integration, they are not probed with a second one.
+                configured = {
+                    entry.data.get("ip") for entry in self._async_current_entries()
+                }
+                found = await Shui3dDiscovery().scan(
+                    [ip for ip in hosts if ip not in configured], PRINTER_PORT
+                )
+                self._discovered = {ip: f"{ip} ({banner[0]})" for ip, banner in found}
+
+                if self._discovered:
+                    return await self.async_step_pick()
+
+                errors = {"base": "No new printers found"}
+
+        source_ip = await network.async_get_source_ip(self.hass)
+
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_NETWORK, default=f"{source_ip}/24"): str}
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None):
+        errors = {}
+
+        if user_input is not None:
+            printers: List[str] = user_input[CONF_PRINTERS]
+
+            if printers:
+                # One flow makes one entry, the other printers show up as
+                # discovered and only need to be confirmed.
+                for ip in printers[1:]:
+                    self.hass.async_create_task(
+                        self.hass.config_entries.flow.async_init(
+                            DOMAIN,
+                            context={
+                                "source": config_entries.SOURCE_INTEGRATION_DISCOVERY
+                            },
+                            data={"ip": ip, CONF_PUSH: self._push},
+                        )
+                    )
+
+                return self.async_create_entry(
+                    title=printers[0], data={"ip": printers[0], CONF_PUSH: self._push}
+                )
+
+            errors = {CONF_PRINTERS: "Pick at least one printer"}
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_PRINTERS, default=list(self._discovered)
+                    ): cv.multi_select(self._discovered)
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_integration_discovery(self, discovery_info: Dict[str, Any]):
+        ip = discovery_info["ip"]
+
+        await self.async_set_unique_id(ip)
+        self._abort_if_unique_id_configured()
+
+        if any(entry.data.get("ip") == ip for entry in self._async_current_entries()):
+            return self.async_abort(reason="already_configured")
+
+        self._discovered = {ip: ip}
+        self._push = discovery_info.get(CONF_PUSH, False)
+        self.context["title_placeholders"] = {"name": ip}
+
+        return await self.async_step_confirm()
+
+    async def async_step_confirm(self, user_input=None):
+        ip = next(iter(self._discovered))
+
+        if user_input is not None:
+            return self.async_create_entry(
+                title=ip, data={"ip": ip, CONF_PUSH: self._push}
+            )
+
+        return self.async_show_form(
+            step_id="confirm", description_placeholders={"ip": ip}
+        )
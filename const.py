@@ -1,2 +1,6 @@
 DOMAIN = "shui_3d_print"
 PRINTER_PORT: int = 8080
+
+CONF_PUSH = "push"
+
+DATA_FLEET = f"{DOMAIN}_fleet"
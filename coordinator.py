@@ -0,0 +1,78 @@
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .const import DOMAIN
+from .shui import Shui3dPollScheduler, Shui3dPrinter, Shui3dPrinterFleet
+
+LOGGER = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = timedelta(seconds=30)
+
+STORAGE_VERSION = 1
+# The snapshot is written at most this often and once more on shutdown
+SNAPSHOT_SAVE_DELAY = 60
+
+
+class Shui3dPrinterCoordinator(DataUpdateCoordinator[None]):
+    """Runs one printer update per interval and pushes it to every entity."""
+
+    printer: Shui3dPrinter
+    scheduler: Shui3dPollScheduler
+    fleet: Shui3dPrinterFleet
+    store: Store
+
+    _interval: float | None = None
+    _starting: bool = True
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        printer: Shui3dPrinter,
+        fleet: Shui3dPrinterFleet,
+        store: Store,
+    ):
+        super().__init__(
+            hass,
+            LOGGER,
+            name=f"{DOMAIN} {printer.ip()}",
+            update_interval=timedelta(seconds=fleet.jitter(UPDATE_INTERVAL.seconds)),
+        )
+        self.printer = printer
+        self.scheduler = Shui3dPollScheduler()
+        self.fleet = fleet
+        self.store = store
+
+    async def _async_update_data(self) -> None:
+        if self._starting:
+            self._starting = False
+            await self.fleet.startup_update(self.printer)
+        else:
+            await self.fleet.update(self.printer)
+
+        if self.printer.is_connected():
+            self.store.async_delay_save(self.printer.snapshot, SNAPSHOT_SAVE_DELAY)
+
+        # The next refresh is scheduled from update_interval once this returns,
+        # jitter keeps printers of the fleet from settling on the same tick.
+        self._interval = self.scheduler.next_interval(self.printer)
+        self.update_interval = self._jittered(self._interval)
+
+    def _jittered(self, interval: float) -> timedelta:
+        return timedelta(seconds=self.fleet.jitter(interval))
+
+    @callback
+    def async_printer_updated(self):
+        # The printer loses its connection or starts heating between refreshes,
+        # the interval picked for the old state must not outlive it.
+        interval = self.scheduler.next_interval(self.printer)
+
+        if interval != self._interval:
+            self._interval = interval
+            self.update_interval = self._jittered(interval)
+            self._schedule_refresh()
+
+        self.async_update_listeners()
@@ -0,0 +1,21 @@
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .coordinator import Shui3dPrinterCoordinator
+
+TO_REDACT = {"ip"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    coordinator: Shui3dPrinterCoordinator = entry.runtime_data
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "printer": coordinator.printer.diagnostics(),
+    }
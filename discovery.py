@@ -0,0 +1,85 @@
+import asyncio
+import ipaddress
+from typing import Iterable, List, Tuple
+
+from .shui import Shui3dPrinterConnection
+
+
+class Shui3dDiscovery:
+    """Finds printers by probing many hosts at once.
+
+    A host counts as a printer once it greets a new session with the banner of
+    the WiFi module, which is what Shui3dPrinterConnection waits for as well.
+    Hosts that do not answer cost one CONNECT_TIMEOUT, so a /24 takes a few
+    seconds at the default concurrency.
+    """
+
+    CONCURRENCY = 64
+    CONNECT_TIMEOUT = 0.5
+    BANNER_TIMEOUT = 1.5
+    MAX_HOSTS = 4096
+
+    def __init__(self, concurrency: int = CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(self, ip: str, port: int) -> List[str] | None:
+        async with self._semaphore:
+            try:
+                (reader, writer) = await asyncio.wait_for(
+                    asyncio.open_connection(ip, port), Shui3dDiscovery.CONNECT_TIMEOUT
+                )
+            except (OSError, asyncio.TimeoutError):
+                return None
+
+            try:
+                return await asyncio.wait_for(
+                    Shui3dDiscovery._read_banner(reader),
+                    Shui3dDiscovery.BANNER_TIMEOUT,
+                )
+            except (OSError, asyncio.TimeoutError, ValueError):
+                return None
+            finally:
+                writer.close()
+
+    @staticmethod
+    async def _read_banner(reader: asyncio.StreamReader) -> List[str] | None:
+        banner: List[str] = []
+
+        while len(banner) < Shui3dPrinterConnection.BANNER_LINES:
+            line = await reader.readline()
+
+            if not line:
+                return None
+
+            line = line.decode(errors="replace").strip()
+
+            if line:
+                banner.append(line)
+
+        return banner
+
+    async def scan(
+        self, hosts: Iterable[str], port: int
+    ) -> List[Tuple[str, List[str]]]:
+        hosts = list(hosts)
+        banners = await asyncio.gather(*(self.probe(ip, port) for ip in hosts))
+
+        return [
+            (ip, banner) for ip, banner in zip(hosts, banners) if banner is not None
+        ]
+
+
+def network_hosts(network: str) -> List[str]:
+    """Addresses of a network like 192.168.1.0/24, a bare address means its /24."""
+    if "/" not in network:
+        network += "/24"
+
+    hosts = ipaddress.ip_network(network, strict=False)
+
+    if hosts.version != 4 or hosts.num_addresses > Shui3dDiscovery.MAX_HOSTS:
+        raise ValueError(
+            f"{network} is not an IPv4 network of up to "
+            f"{Shui3dDiscovery.MAX_HOSTS} hosts"
+        )
+
+    return [str(ip) for ip in hosts.hosts()]
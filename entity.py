@@ -0,0 +1,56 @@
+from typing import Any, Callable, Tuple
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .coordinator import Shui3dPrinterCoordinator
+from .shui import Shui3dChangeFilter
+
+
+class Shui3dPrinterEntity(CoordinatorEntity[Shui3dPrinterCoordinator]):
+    _change_filter: Shui3dChangeFilter | None = None
+    _written: Tuple[bool, bool] | None = None
+
+    def __init__(self, coordinator: Shui3dPrinterCoordinator, name: str, id: str):
+        super().__init__(coordinator)
+        self._attr_unique_id = unique_id(coordinator.config_entry.entry_id, id)
+        self._attr_name = name
+
+    def watch(self, getter: Callable[[], Any]):
+        self._change_filter = self.coordinator.printer.change_filter(getter)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Every refresh and auto report lands here, the state is only written
+        # once the watched value moved past its deadband or availability or
+        # staleness changed.
+        changed = self._change_filter is None or self._change_filter.changed()
+        written = (self.available, self.coordinator.printer.is_stale())
+
+        if changed or written != self._written:
+            self._written = written
+            self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        if self.coordinator.printer.is_stale():
+            return {"stale": True}
+
+        return None
+
+    @property
+    def device_info(self):
+        entry = self.coordinator.config_entry
+
+        return {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": f"Two Trees Bluer {entry.title}",
+            "sw_version": "shui",
+            "model": "Bluer",
+            "manufacturer": "Two Trees",
+        }
+
+
+def unique_id(entry_id: str, id: str) -> str:
+    return f"{entry_id}_{id}"
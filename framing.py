@@ -0,0 +1,86 @@
+from typing import Tuple
+
+
+class Shui3dLineBuffer:
+    """Receive buffer the transport reads into directly.
+
+    One bytearray is allocated per connection. Complete lines are handed out
+    as a range of it, and only an unfinished line is ever moved, to the front
+    of the buffer when the free space at the end runs low. A line that does not
+    fit into the buffer is dropped up to its newline and counted.
+    """
+
+    SIZE = 65536
+    MIN_READ = 4096
+
+    overflows: int = 0
+
+    _start: int = 0
+    _end: int = 0
+    _skip: bool = False
+
+    def __init__(self, size: int = SIZE):
+        self._data = bytearray(size)
+        self._view = memoryview(self._data)
+
+    def data(self) -> bytearray:
+        return self._data
+
+    def view(self) -> memoryview:
+        return self._view
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+        self._skip = False
+
+    def writable(self) -> memoryview:
+        size = len(self._data)
+
+        if size - self._end < Shui3dLineBuffer.MIN_READ and self._start:
+            pending = self._end - self._start
+            self._data[:pending] = self._view[self._start : self._end]
+            self._start = 0
+            self._end = pending
+
+        if self._end == size:
+            self.overflows += 1
+            self._skip = True
+            self._start = 0
+            self._end = 0
+
+        return self._view[self._end :]
+
+    def commit(self, nbytes: int):
+        self._end += nbytes
+
+    def frame(self) -> Tuple[int, int]:
+        """Take the complete lines received so far, as start and end offsets."""
+        start = self._start
+
+        if self._skip:
+            newline = self._data.find(b"\n", start, self._end)
+
+            if newline < 0:
+                self._start = self._end = 0
+                return (0, 0)
+
+            start = newline + 1
+            self._skip = False
+
+        newline = self._data.rfind(b"\n", start, self._end)
+
+        if newline < 0:
+            self._start = start
+            return (start, start)
+
+        end = newline + 1
+
+        # Everything was consumed, the next read starts at the front again and
+        # the buffer never has to move anything
+        if end == self._end:
+            self._start = self._end = 0
+        else:
+            self._start = end
+
+        return (start, end)
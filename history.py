@@ -0,0 +1,202 @@
+import math
+from array import array
+
+
+class Shui3dTemperatureHistory:
+    """Fixed size ring of timestamped samples of one heater.
+
+    Samples older than WINDOW seconds leave the running sums, so the rate
+    and stability are O(1) per sample and per query.
+    """
+
+    SIZE = 128
+    WINDOW = 60.0
+    REBASE_AFTER = 3600.0
+
+    _times: array
+    _temps: array
+    _start: int = 0
+    _count: int = 0
+    _origin: float = 0.0
+
+    _st: float = 0.0
+    _sy: float = 0.0
+    _stt: float = 0.0
+    _sty: float = 0.0
+    _syy: float = 0.0
+
+    def __init__(self, size: int = SIZE, window: float = WINDOW):
+        self._size = size
+        self._window = window
+        self._times = array("d", [0.0]) * size
+        self._temps = array("d", [0.0]) * size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+        self._st = self._sy = self._stt = self._sty = self._syy = 0.0
+
+    def add(self, temp: float, timestamp: float):
+        if self._count == 0:
+            self._origin = timestamp
+        elif self._count == self._size:
+            self._evict()
+
+        t = timestamp - self._origin
+        i = (self._start + self._count) % self._size
+
+        self._times[i] = t
+        self._temps[i] = temp
+        self._count += 1
+        self._include(t, temp, 1)
+
+        while self._count > 1 and t - self._times[self._start] > self._window:
+            self._evict()
+
+        # Times are kept relative to the oldest sample, from time to time move
+        # the origin forward and rebuild the sums to keep them precise.
+        if t > Shui3dTemperatureHistory.REBASE_AFTER:
+            self._rebase()
+
+    def latest(self) -> float | None:
+        if not self._count:
+            return None
+
+        return self._temps[(self._start + self._count - 1) % self._size]
+
+    def rate(self) -> float | None:
+        """Least squares slope in degrees per second."""
+        n = self._count
+
+        if n < 2:
+            return None
+
+        denominator = n * self._stt - self._st * self._st
+
+        if denominator <= 1e-9:
+            return None
+
+        return (n * self._sty - self._st * self._sy) / denominator
+
+    def stability(self) -> float | None:
+        """Standard deviation of the temperature over the window."""
+        n = self._count
+
+        if n < 2:
+            return None
+
+        mean = self._sy / n
+
+        return math.sqrt(max(self._syy / n - mean * mean, 0.0))
+
+    def time_to_target(self, target: float, tolerance: float) -> float | None:
+        latest = self.latest()
+
+        if latest is None or target <= 0:
+            return None
+
+        remaining = target - latest
+
+        if abs(remaining) <= tolerance:
+            return 0.0
+
+        rate = self.rate()
+
+        if rate is None or rate * remaining <= 0:
+            return None
+
+        return (remaining - math.copysign(tolerance, remaining)) / rate
+
+    def _include(self, t: float, temp: float, sign: int):
+        self._st += sign * t
+        self._sy += sign * temp
+        self._stt += sign * t * t
+        self._sty += sign * t * temp
+        self._syy += sign * temp * temp
+
+    def _evict(self):
+        i = self._start
+        self._include(self._times[i], self._temps[i], -1)
+        self._start = (i + 1) % self._size
+        self._count -= 1
+
+    def _rebase(self):
+        offset = self._times[self._start]
+        self._origin += offset
+        self._st = self._sy = self._stt = self._sty = self._syy = 0.0
+
+        for k in range(self._count):
+            i = (self._start + k) % self._size
+            self._times[i] -= offset
+            self._include(self._times[i], self._temps[i], 1)
+
+
+class Shui3dPrintEstimator:
+    """Smoothed SD read rate of the running print.
+
+    The rate is an exponential moving average with a time constant of TAU
+    seconds, samples without progress are treated as a pause and neither
+    decay the rate nor count toward the next interval.
+    """
+
+    TAU = 120.0
+
+    _printed: int | None = None
+    _total: int | None = None
+    _timestamp: float = 0.0
+    _rate: float | None = None
+    _paused: bool = False
+
+    def reset(self):
+        self._printed = None
+        self._total = None
+        self._rate = None
+        self._paused = False
+
+    def add(self, printed: int, total: int, timestamp: float):
+        # Another file or a restarted print, the old rate means nothing anymore
+        if self._printed is None or total != self._total or printed < self._printed:
+            self.reset()
+            self._printed = printed
+            self._total = total
+            self._timestamp = timestamp
+            return
+
+        elapsed = timestamp - self._timestamp
+        progress = printed - self._printed
+
+        self._timestamp = timestamp
+
+        if progress == 0:
+            self._paused = True
+            return
+
+        self._paused = False
+        self._printed = printed
+
+        if elapsed <= 0:
+            return
+
+        rate = progress / elapsed
+
+        if self._rate is None:
+            self._rate = rate
+        else:
+            self._rate += (1 - math.exp(-elapsed / Shui3dPrintEstimator.TAU)) * (
+                rate - self._rate
+            )
+
+    def is_paused(self) -> bool:
+        return self._paused
+
+    def rate(self) -> float | None:
+        return self._rate
+
+    def remaining(self) -> float | None:
+        if self._rate is None or self._rate <= 0:
+            return None
+
+        return (self._total - self._printed) / self._rate
@@ -0,0 +1,91 @@
+import bisect
+from typing import Any, Dict, List
+
+
+class Shui3dLatencyHistogram:
+    # Upper bounds of the buckets in seconds, the last bucket is unbounded
+    BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    _counts: List[int]
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __init__(self):
+        self._counts = [0] * (len(Shui3dLatencyHistogram.BOUNDS) + 1)
+
+    def add(self, seconds: float):
+        self._counts[bisect.bisect_left(Shui3dLatencyHistogram.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> float | None:
+        # Upper bound of the bucket holding the quantile, the max for the last one
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+
+        for bound, count in zip(Shui3dLatencyHistogram.BOUNDS, self._counts):
+            seen += count
+
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        buckets = {
+            f"le_{bound}": count
+            for bound, count in zip(Shui3dLatencyHistogram.BOUNDS, self._counts)
+        }
+        buckets["inf"] = self._counts[-1]
+
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class Shui3dConnectionMetrics:
+    connect_time: Shui3dLatencyHistogram
+    first_byte: Shui3dLatencyHistogram
+    command_latency: Shui3dLatencyHistogram
+
+    bytes_in: int = 0
+    bytes_out: int = 0
+    commands: int = 0
+    timeouts: int = 0
+    sessions: int = 0
+    reconnects: int = 0
+    connect_failures: int = 0
+    parse_errors: int = 0
+
+    def __init__(self):
+        self.connect_time = Shui3dLatencyHistogram()
+        self.first_byte = Shui3dLatencyHistogram()
+        self.command_latency = Shui3dLatencyHistogram()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "connect_time": self.connect_time.as_dict(),
+            "first_byte": self.first_byte.as_dict(),
+            "command_latency": self.command_latency.as_dict(),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "commands": self.commands,
+            "timeouts": self.timeouts,
+            "sessions": self.sessions,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "parse_errors": self.parse_errors,
+        }
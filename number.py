@@ -1,13 +1,14 @@
 from homeassistant.components.number import NumberEntity, NumberDeviceClass
 import logging
-from typing import Any, Callable, Awaitable, List
+from typing import Any, Callable, List
 
 from .shui import Shui3dPrinter, Shui3dPrinterConnectionStatus, Shui3dPrintStatus
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import PERCENTAGE, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .const import DOMAIN
+from .coordinator import Shui3dPrinterCoordinator
+from .entity import Shui3dPrinterEntity
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,18 +18,20 @@ async def async_setup_entry(
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    printer: Shui3dPrinter = config_entry.runtime_data
+    coordinator: Shui3dPrinterCoordinator = config_entry.runtime_data
 
-    if printer is None or not isinstance(printer, Shui3dPrinter):
+    if coordinator is None or not isinstance(coordinator, Shui3dPrinterCoordinator):
         LOGGER.error(
-            "config_entry.runtime_data does not containt Shui3dPrinter instance"
+            "config_entry.runtime_data does not containt Shui3dPrinterCoordinator instance"
         )
         return
 
+    printer: Shui3dPrinter = coordinator.printer
+
     async_add_entities(
         [
             PrinterNumber(
-                printer.ensure_update,
+                coordinator,
                 printer.target_bed_temp,
                 printer.set_target_bed_temp,
                 "Target Bed Temp",
@@ -40,7 +43,7 @@ async def async_setup_entry(
                 80,
             ),
             PrinterNumber(
-                printer.ensure_update,
+                coordinator,
                 printer.target_extruder_temp,
                 printer.set_target_extruder_temp,
                 "Target Extruder Temp",
@@ -55,10 +58,9 @@ async def async_setup_entry(
     )
 
 
-class PrinterNumber(NumberEntity):
+class PrinterNumber(Shui3dPrinterEntity, NumberEntity):
     _getter: Callable[[], Any]
     _setter: Callable[[float], Any]
-    _updater: Callable[[], Awaitable[Any]]
     _min: float
     _max: float
     _unit: str
@@ -67,7 +69,7 @@ class PrinterNumber(NumberEntity):
 
     def __init__(
         self,
-        updater: Callable[[], Awaitable[Any]],
+        coordinator: Shui3dPrinterCoordinator,
         getter: Callable[[], Any],
         setter: Callable[[float], Any],
         name: str,
@@ -78,24 +80,23 @@ class PrinterNumber(NumberEntity):
         min: float,
         max: float,
     ):
-        self._attr_unique_id = id
-        self._attr_name = name
+        super().__init__(coordinator, name, id)
         self._getter = getter
+        self.watch(getter)
         self._setter = setter
-        self._updater = updater
         self._unit = unit
         self._icon = icon
         self._device_class = deivce_class
         self._min = min
         self._max = max
 
-    async def async_update(self):
-        await self._updater()
-
     async def async_set_native_value(self, value: float) -> None:
         await self._setter(value)
 
-        self.schedule_update_ha_state()
+        self.coordinator.async_update_listeners()
+
+        # A new target usually starts heating, let the scheduler switch to fast polling
+        await self.coordinator.async_request_refresh()
 
     @property
     def native_value(self):
@@ -124,7 +125,3 @@ class PrinterNumber(NumberEntity):
     @property
     def device_class(self) -> NumberDeviceClass | None:
         return self._device_class
-
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, "shui_3d_printer")}}
@@ -0,0 +1,186 @@
+import re
+from typing import Dict, List
+
+# One alternation per report line, anchored at line starts, so a single
+# finditer pass over the received bytes extracts everything the printer model
+# needs without splitting the stream into lines or tokens.
+_NUMBER = rb" *(-?\d+(?:\.\d+)?)"
+_PATTERN = (
+    # 1, 2 extruder and 3, 4 bed of "ok T:200.0 /210.0 B:60.0 /60.0 @:0"
+    rb"(?m)^(?:ok)? *T0?:" + _NUMBER + rb" */" + _NUMBER
+    + rb"(?:[^\n]*? B:" + _NUMBER + rb" */" + _NUMBER + rb")?"
+    # 5, 6 bed alone
+    + rb"|^B:" + _NUMBER + rb" */" + _NUMBER
+    # 7, 8 "SD printing byte 100/1000"
+    + rb"|^SD printing byte (\d+)/(\d+)"
+    # 9
+    + rb"|^(Not SD printing)"
+    # 10 "echo:busy: processing"
+    + rb"|^(?:echo:)?(busy)"
+    # 11, 12, 13 "X:0.00 Y:0.00 Z:0.00 E:0.00 Count X:0 Y:0 Z:0"
+    + rb"|^X:" + _NUMBER + rb" Y:" + _NUMBER + rb" Z:" + _NUMBER
+    # 14 card inserted or removed, "echo:SD card ok", "echo:SD card released"
+    + rb"|^(?:echo:)?(SD card ok|SD card released|SD init fail|Card removed)"
+    # 15 feedrate of M220 "FR:100%"
+    + rb"|^FR:" + _NUMBER + rb"%"
+    # 16 flow of M221 "echo:E0 Flow: 100%"
+    + rb"|^(?:echo:)?E\d+ Flow:" + _NUMBER + rb"%"
+)
+
+BYTES_PATTERN = re.compile(_PATTERN)
+TEXT_PATTERN = re.compile(_PATTERN.decode())
+
+
+class Shui3dReport:
+    extruder_temp: float | None = None
+    target_extruder_temp: float | None = None
+    bed_temp: float | None = None
+    target_bed_temp: float | None = None
+
+    sd_printed: int | None = None
+    sd_total: int | None = None
+    sd_idle: bool = False
+
+    busy: bool = False
+
+    sd_card_changed: bool = False
+
+    position: List[float] | None = None
+
+    feedrate: float | None = None
+    flow: float | None = None
+
+    def has_temperatures(self) -> bool:
+        return self.extruder_temp is not None or self.bed_temp is not None
+
+    def has_sd_status(self) -> bool:
+        return self.sd_total is not None or self.sd_idle
+
+
+class Shui3dReportParser:
+    MAX_LINE = 4096
+
+    _tail: bytearray
+
+    def __init__(self):
+        self._tail = bytearray()
+
+    def feed(self, data: bytes) -> Shui3dReport:
+        # Only complete lines are scanned, an unterminated line is carried
+        # over to the next chunk so that values split by a read are not lost.
+        report = Shui3dReport()
+        end = data.rfind(b"\n")
+
+        if end < 0:
+            self._tail += data
+
+            if len(self._tail) > Shui3dReportParser.MAX_LINE:
+                self._tail.clear()
+
+            return report
+
+        start = 0
+
+        if self._tail:
+            start = data.find(b"\n") + 1
+            self._tail += data[:start]
+            scan(BYTES_PATTERN, self._tail, 0, len(self._tail), report)
+            self._tail.clear()
+
+        scan(BYTES_PATTERN, data, start, end + 1, report)
+
+        self._tail += data[end + 1 :]
+
+        return report
+
+    @staticmethod
+    def parse(data: bytes) -> Shui3dReport:
+        return Shui3dReportParser.parse_range(data, 0, len(data))
+
+    @staticmethod
+    def parse_range(data: bytes | bytearray, start: int, end: int) -> Shui3dReport:
+        # The range has to start at a line start, as received lines always do
+        report = Shui3dReport()
+        scan(BYTES_PATTERN, data, start, end, report)
+
+        return report
+
+    @staticmethod
+    def parse_lines(lines: List[str]) -> Shui3dReport:
+        text = "\n".join(lines)
+        report = Shui3dReport()
+        scan(TEXT_PATTERN, text, 0, len(text), report)
+
+        return report
+
+
+def scan(pattern: re.Pattern, data, start: int, end: int, report: Shui3dReport):
+    # Later lines supersede earlier ones, so only the last match of each kind
+    # is converted to numbers once the pass is over.
+    extruder = bed = sd = position = None
+
+    for match in pattern.finditer(data, start, end):
+        # The last group that took part in a match tells which line it was
+        last = match.lastindex
+
+        if last <= 4:
+            extruder = match
+
+            if last == 4:
+                bed = match
+        elif last == 6:
+            bed = match
+        elif last == 8:
+            sd = match
+        elif last == 9:
+            report.sd_idle = True
+        elif last == 10:
+            report.busy = True
+        elif last == 14:
+            report.sd_card_changed = True
+        elif last == 15:
+            report.feedrate = float(match.group(15))
+        elif last == 16:
+            report.flow = float(match.group(16))
+        else:
+            position = match
+
+    if extruder is not None:
+        report.extruder_temp = float(extruder.group(1))
+        report.target_extruder_temp = float(extruder.group(2))
+
+    if bed is not None:
+        offset = 3 if bed.lastindex == 4 else 5
+        report.bed_temp = float(bed.group(offset))
+        report.target_bed_temp = float(bed.group(offset + 1))
+
+    if sd is not None:
+        report.sd_printed = int(sd.group(7))
+        report.sd_total = int(sd.group(8))
+
+    if position is not None:
+        report.position = [
+            float(position.group(11)),
+            float(position.group(12)),
+            float(position.group(13)),
+        ]
+
+
+def parse_file_list(lines: List[str]) -> Dict[str, int | None]:
+    """Files of an M20 listing with their sizes, when the firmware prints them."""
+    files: Dict[str, int | None] = {}
+    listing = False
+
+    for line in lines:
+        if line.startswith("Begin file list"):
+            listing = True
+        elif line.startswith("End file list"):
+            break
+        elif listing:
+            parts = line.split()
+
+            if parts:
+                size = parts[1] if len(parts) > 1 else ""
+                files[parts[0]] = int(size) if size.isdigit() else None
+
+    return files
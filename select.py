@@ -0,0 +1,79 @@
+import logging
+from typing import List
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .coordinator import Shui3dPrinterCoordinator
+from .entity import Shui3dPrinterEntity
+from .shui import Shui3dPrinter
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    coordinator: Shui3dPrinterCoordinator = config_entry.runtime_data
+
+    if coordinator is None or not isinstance(coordinator, Shui3dPrinterCoordinator):
+        LOGGER.error(
+            "config_entry.runtime_data does not containt Shui3dPrinterCoordinator instance"
+        )
+        return
+
+    async_add_entities(
+        [
+            PrinterFileSelect(
+                coordinator, "SD File", "sd file id", "mdi:file-cog-outline"
+            )
+        ]
+    )
+
+
+class PrinterFileSelect(Shui3dPrinterEntity, SelectEntity):
+    _printer: Shui3dPrinter
+    _icon: str
+
+    def __init__(
+        self, coordinator: Shui3dPrinterCoordinator, name: str, id: str, icon: str
+    ):
+        super().__init__(coordinator, name, id)
+        self._printer = coordinator.printer
+        self._icon = icon
+        self.watch(
+            lambda: (tuple(self._printer.catalog()), self._printer.selected_file())
+        )
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+
+        # The card is listed once while the entity is around, and again only
+        # after an upload of a long name or a card change
+        self._printer.want_catalog()
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._printer.want_catalog(False)
+
+        await super().async_will_remove_from_hass()
+
+    async def async_select_option(self, option: str) -> None:
+        self._printer.select_file(option)
+        self.async_write_ha_state()
+
+    @property
+    def icon(self):
+        return self._icon
+
+    @property
+    def options(self) -> List[str]:
+        return self._printer.catalog()
+
+    @property
+    def current_option(self) -> str | None:
+        selected = self._printer.selected_file()
+
+        return selected if selected in self._printer.catalog() else None
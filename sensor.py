@@ -1,5 +1,6 @@
 import logging
-from typing import Any, Callable, Awaitable, List
+from datetime import datetime
+from typing import Any, Callable, List
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
 from homeassistant.components.binary_sensor import (
@@ -7,32 +8,73 @@ from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE, UnitOfTemperature
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfDataRate,
+    UnitOfInformation,
+    UnitOfLength,
+    UnitOfTemperature,
+    UnitOfTime,
+)
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .const import DOMAIN
+from .coordinator import Shui3dPrinterCoordinator
+from .entity import Shui3dPrinterEntity
+from .metrics import Shui3dLatencyHistogram
 from .shui import Shui3dPrinter, Shui3dPrinterConnectionStatus, Shui3dPrintStatus
 
 LOGGER = logging.getLogger(__name__)
 
+HEATING_RATE = f"{UnitOfTemperature.CELSIUS}/min"
+
+
+def milliseconds(seconds: float | None):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def axis(position: List[float] | None, index: int):
+    return None if position is None else position[index]
+
+
+def latency_sensor(
+    coordinator: Shui3dPrinterCoordinator,
+    histogram: Shui3dLatencyHistogram,
+    getter: Callable[[Shui3dLatencyHistogram], float | None],
+    name: str,
+    id: str,
+):
+    return PrinterDiagnosticSensor(
+        coordinator,
+        lambda: milliseconds(getter(histogram)),
+        name,
+        id,
+        UnitOfTime.MILLISECONDS,
+        "mdi:timer-outline",
+        SensorDeviceClass.DURATION,
+    )
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    printer: Shui3dPrinter = config_entry.runtime_data
+    coordinator: Shui3dPrinterCoordinator = config_entry.runtime_data
 
-    if printer is None or not isinstance(printer, Shui3dPrinter):
+    if coordinator is None or not isinstance(coordinator, Shui3dPrinterCoordinator):
         LOGGER.error(
-            "config_entry.runtime_data does not containt Shui3dPrinter instance"
+            "config_entry.runtime_data does not containt Shui3dPrinterCoordinator instance"
         )
         return
 
+    printer: Shui3dPrinter = coordinator.printer
+    metrics = printer.metrics()
+
     async_add_entities(
         [
             PrinterSensor(
-                printer.ensure_update,
+                coordinator,
                 printer.bed_temp,
                 "Bed Temp",
                 "bed temp id",
@@ -41,7 +83,7 @@ async def async_setup_entry(
                 SensorDeviceClass.TEMPERATURE,
             ),
             PrinterSensor(
-                printer.ensure_update,
+                coordinator,
                 printer.extruder_temp,
                 "Extruder Temp",
                 "extruder temp id",
@@ -50,7 +92,7 @@ async def async_setup_entry(
                 SensorDeviceClass.TEMPERATURE,
             ),
             PrinterEnum(
-                printer.ensure_update,
+                coordinator,
                 printer.status,
                 "Connection",
                 "connection id",
@@ -58,7 +100,7 @@ async def async_setup_entry(
                 [member.name for member in Shui3dPrinterConnectionStatus],
             ),
             PrinterEnum(
-                printer.ensure_update,
+                coordinator,
                 printer.print_status,
                 "Print Status",
                 "print status id",
@@ -66,7 +108,7 @@ async def async_setup_entry(
                 [member.name for member in Shui3dPrintStatus],
             ),
             PrinterSensor(
-                printer.ensure_update,
+                coordinator,
                 printer.print_progress,
                 "Print Progress",
                 "print progress id",
@@ -74,38 +116,255 @@ async def async_setup_entry(
                 "mdi:percent-outline",
                 None,
             ),
+            PrinterSensor(
+                coordinator,
+                printer.print_time_remaining,
+                "Print Time Remaining",
+                "print time remaining id",
+                UnitOfTime.SECONDS,
+                "mdi:timer-outline",
+                SensorDeviceClass.DURATION,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.print_finish_time,
+                "Print Finish Time",
+                "print finish time id",
+                None,
+                "mdi:clock-end",
+                SensorDeviceClass.TIMESTAMP,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.print_throughput,
+                "Print Throughput",
+                "print throughput id",
+                UnitOfDataRate.BYTES_PER_SECOND,
+                "mdi:speedometer",
+                SensorDeviceClass.DATA_RATE,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.upload_progress,
+                "Upload Progress",
+                "upload progress id",
+                PERCENTAGE,
+                "mdi:file-upload-outline",
+                None,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.upload_rate,
+                "Upload Rate",
+                "upload rate id",
+                UnitOfDataRate.BYTES_PER_SECOND,
+                "mdi:speedometer",
+                SensorDeviceClass.DATA_RATE,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.bed_heating_rate,
+                "Bed Heating Rate",
+                "bed heating rate id",
+                HEATING_RATE,
+                "mdi:thermometer-chevron-up",
+                None,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.bed_temp_stability,
+                "Bed Temp Stability",
+                "bed temp stability id",
+                UnitOfTemperature.CELSIUS,
+                "mdi:thermometer-lines",
+                None,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.bed_time_to_target,
+                "Bed Time To Target",
+                "bed time to target id",
+                UnitOfTime.SECONDS,
+                "mdi:timer-sand",
+                SensorDeviceClass.DURATION,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.extruder_heating_rate,
+                "Extruder Heating Rate",
+                "extruder heating rate id",
+                HEATING_RATE,
+                "mdi:thermometer-chevron-up",
+                None,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.extruder_temp_stability,
+                "Extruder Temp Stability",
+                "extruder temp stability id",
+                UnitOfTemperature.CELSIUS,
+                "mdi:thermometer-lines",
+                None,
+            ),
+            PrinterSensor(
+                coordinator,
+                printer.extruder_time_to_target,
+                "Extruder Time To Target",
+                "extruder time to target id",
+                UnitOfTime.SECONDS,
+                "mdi:timer-sand",
+                SensorDeviceClass.DURATION,
+            ),
+            latency_sensor(
+                coordinator,
+                metrics.connect_time,
+                Shui3dLatencyHistogram.mean,
+                "Connect Time",
+                "connect time id",
+            ),
+            latency_sensor(
+                coordinator,
+                metrics.first_byte,
+                Shui3dLatencyHistogram.mean,
+                "Time To First Byte",
+                "time to first byte id",
+            ),
+            latency_sensor(
+                coordinator,
+                metrics.command_latency,
+                Shui3dLatencyHistogram.mean,
+                "Command Latency",
+                "command latency id",
+            ),
+            latency_sensor(
+                coordinator,
+                metrics.command_latency,
+                lambda histogram: histogram.quantile(0.95),
+                "Command Latency P95",
+                "command latency p95 id",
+            ),
+            PrinterTelemetrySensor(
+                coordinator,
+                "position",
+                lambda: axis(printer.position(), 0),
+                "Position X",
+                "position x id",
+                UnitOfLength.MILLIMETERS,
+                "mdi:axis-x-arrow",
+                SensorDeviceClass.DISTANCE,
+            ),
+            PrinterTelemetrySensor(
+                coordinator,
+                "position",
+                lambda: axis(printer.position(), 1),
+                "Position Y",
+                "position y id",
+                UnitOfLength.MILLIMETERS,
+                "mdi:axis-y-arrow",
+                SensorDeviceClass.DISTANCE,
+            ),
+            PrinterTelemetrySensor(
+                coordinator,
+                "position",
+                lambda: axis(printer.position(), 2),
+                "Position Z",
+                "position z id",
+                UnitOfLength.MILLIMETERS,
+                "mdi:axis-z-arrow",
+                SensorDeviceClass.DISTANCE,
+            ),
+            PrinterTelemetrySensor(
+                coordinator,
+                "feedrate",
+                printer.feedrate,
+                "Feedrate",
+                "feedrate id",
+                PERCENTAGE,
+                "mdi:speedometer",
+                None,
+            ),
+            PrinterTelemetrySensor(
+                coordinator,
+                "flow",
+                printer.flow,
+                "Flow",
+                "flow id",
+                PERCENTAGE,
+                "mdi:water-percent",
+                None,
+            ),
+            PrinterDiagnosticSensor(
+                coordinator,
+                lambda: metrics.bytes_in,
+                "Bytes Received",
+                "bytes received id",
+                UnitOfInformation.BYTES,
+                "mdi:download-network",
+                SensorDeviceClass.DATA_SIZE,
+            ),
+            PrinterDiagnosticSensor(
+                coordinator,
+                lambda: metrics.bytes_out,
+                "Bytes Sent",
+                "bytes sent id",
+                UnitOfInformation.BYTES,
+                "mdi:upload-network",
+                SensorDeviceClass.DATA_SIZE,
+            ),
+            PrinterDiagnosticSensor(
+                coordinator,
+                lambda: metrics.timeouts,
+                "Timeouts",
+                "timeouts id",
+                None,
+                "mdi:timer-alert-outline",
+                None,
+            ),
+            PrinterDiagnosticSensor(
+                coordinator,
+                lambda: metrics.reconnects,
+                "Reconnects",
+                "reconnects id",
+                None,
+                "mdi:connection",
+                None,
+            ),
+            PrinterDiagnosticSensor(
+                coordinator,
+                lambda: metrics.parse_errors,
+                "Parse Errors",
+                "parse errors id",
+                None,
+                "mdi:alert-circle-outline",
+                None,
+            ),
         ]
     )
 
 
-class PrinterSensor(SensorEntity):
+class PrinterSensor(Shui3dPrinterEntity, SensorEntity):
     _getter: Callable[[], Any]
-    _updater: Callable[[], Awaitable[Any]]
     _unit: str
     _icon: str
     _device_class: SensorDeviceClass | None
 
     def __init__(
         self,
-        updater: Callable[[], Awaitable[Any]],
+        coordinator: Shui3dPrinterCoordinator,
         getter: Callable[[], Any],
         name: str,
         id: str,
-        unit: str,
+        unit: str | None,
         icon: str,
         deivce_class: SensorDeviceClass | None,
     ):
-        self._attr_unique_id = id
-        self._attr_name = name
+        super().__init__(coordinator, name, id)
         self._getter = getter
-        self._updater = updater
+        self.watch(getter)
         self._unit = unit
         self._icon = icon
         self._device_class = deivce_class
 
-    async def async_update(self):
-        await self._updater()
-
     @property
     def icon(self):
         return self._icon
@@ -118,42 +377,63 @@ class PrinterSensor(SensorEntity):
     # Самое важное поле, значение объекта.
     @property
     def state(self):
-        return self._getter()
+        value = self._getter()
+
+        if isinstance(value, datetime):
+            return value.isoformat()
+
+        return value
 
     @property
     def device_class(self) -> SensorDeviceClass | None:
         return self._device_class
 
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, "shui_3d_printer")}}
 
+class PrinterDiagnosticSensor(PrinterSensor):
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+
+class PrinterTelemetrySensor(PrinterSensor):
+    """Optional value the printer is only asked for while this entity is enabled."""
+
+    _attr_entity_registry_enabled_default = False
+
+    _telemetry: str
 
-class PrinterBinarySensor(BinarySensorEntity):
+    def __init__(self, coordinator: Shui3dPrinterCoordinator, telemetry: str, *args):
+        super().__init__(coordinator, *args)
+        self._telemetry = telemetry
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.coordinator.printer.want_telemetry(self._telemetry)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self.coordinator.printer.want_telemetry(self._telemetry, False)
+        await super().async_will_remove_from_hass()
+
+
+class PrinterBinarySensor(Shui3dPrinterEntity, BinarySensorEntity):
     _getter: Callable[[], bool]
-    _updater: Callable[[], Awaitable[Any]]
     _icon: str
     _device_class: BinarySensorDeviceClass | None
 
     def __init__(
         self,
-        updater: Callable[[], Awaitable[Any]],
+        coordinator: Shui3dPrinterCoordinator,
         getter: Callable[[], Any],
         name: str,
         id: str,
         icon: str,
         deivce_class: BinarySensorDeviceClass | None,
     ):
-        self._attr_unique_id = id
-        self._attr_name = name
+        super().__init__(coordinator, name, id)
         self._getter = getter
-        self._updater = updater
+        self.watch(getter)
         self._icon = icon
         self._device_class = deivce_class
 
-    async def async_update(self):
-        await self._updater()
-
     @property
     def icon(self):
         return self._icon
@@ -166,36 +446,27 @@ class PrinterBinarySensor(BinarySensorEntity):
     def device_class(self) -> BinarySensorDeviceClass | None:
         return self._device_class
 
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, "shui_3d_printer")}}
-
 
-class PrinterEnum(SensorEntity):
+class PrinterEnum(Shui3dPrinterEntity, SensorEntity):
     _getter: Callable[[], bool]
-    _updater: Callable[[], Awaitable[Any]]
     _icon: str
     _options: List[str]
 
     def __init__(
         self,
-        updater: Callable[[], Awaitable[Any]],
+        coordinator: Shui3dPrinterCoordinator,
         getter: Callable[[], Any],
         name: str,
         id: str,
         icon: str,
         options: List[str],
     ):
-        self._attr_unique_id = id
-        self._attr_name = name
+        super().__init__(coordinator, name, id)
         self._getter = getter
-        self._updater = updater
+        self.watch(getter)
         self._icon = icon
         self._options = options
 
-    async def async_update(self):
-        await self._updater()
-
     @property
     def icon(self):
         return self._icon
@@ -211,7 +482,3 @@ class PrinterEnum(SensorEntity):
     @property
     def options(self):
         return self._options
-
-    @property
-    def device_info(self):
-        return {"identifiers": {(DOMAIN, "shui_3d_printer")}}
@@ -0,0 +1,193 @@
+import os
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import DOMAIN
+from .coordinator import Shui3dPrinterCoordinator
+from .shui import Shui3dPrinter
+
+SERVICE_UPLOAD_GCODE = "upload_gcode"
+SERVICE_RUN_GCODE = "run_gcode"
+SERVICE_START_CAPTURE = "start_capture"
+SERVICE_STOP_CAPTURE = "stop_capture"
+SERVICE_PREHEAT = "preheat"
+
+ATTR_DEVICE_ID = "device_id"
+ATTR_PATH = "path"
+ATTR_FILENAME = "filename"
+ATTR_GCODE = "gcode"
+ATTR_BED_TEMP = "bed_temp"
+ATTR_EXTRUDER_TEMP = "extruder_temp"
+ATTR_STEPS = "steps"
+ATTR_TOLERANCE = "tolerance"
+ATTR_HOLD = "hold"
+ATTR_TIMEOUT = "timeout"
+
+UPLOAD_GCODE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+START_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_PATH): cv.string,
+    }
+)
+
+STOP_CAPTURE_SCHEMA = vol.Schema({vol.Required(ATTR_DEVICE_ID): cv.string})
+
+RUN_GCODE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_GCODE): cv.string,
+    }
+)
+
+PREHEAT_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_DEVICE_ID): cv.string,
+            vol.Optional(ATTR_BED_TEMP): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=120)
+            ),
+            vol.Optional(ATTR_EXTRUDER_TEMP): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=300)
+            ),
+            vol.Optional(ATTR_STEPS, default=1): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=20)
+            ),
+            vol.Optional(
+                ATTR_TOLERANCE, default=Shui3dPrinter.HEATING_TOLERANCE
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.5)),
+            vol.Optional(ATTR_HOLD, default=Shui3dPrinter.PREHEAT_HOLD): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+            vol.Optional(ATTR_TIMEOUT, default=Shui3dPrinter.PREHEAT_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=1)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_BED_TEMP, ATTR_EXTRUDER_TEMP),
+)
+
+
+def coordinator_from_call(
+    hass: HomeAssistant, call: ServiceCall
+) -> Shui3dPrinterCoordinator:
+    device = dr.async_get(hass).async_get(call.data[ATTR_DEVICE_ID])
+
+    if device is not None:
+        for entry_id in device.config_entries:
+            entry = hass.config_entries.async_get_entry(entry_id)
+
+            if (
+                entry is not None
+                and entry.domain == DOMAIN
+                and entry.state is ConfigEntryState.LOADED
+            ):
+                return entry.runtime_data
+
+    raise ServiceValidationError(
+        f"Device {call.data[ATTR_DEVICE_ID]} is not a loaded Shui printer"
+    )
+
+
+def async_setup_services(hass: HomeAssistant):
+    async def async_upload_gcode(call: ServiceCall):
+        coordinator = coordinator_from_call(hass, call)
+        path = call.data[ATTR_PATH]
+
+        if not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"{path} is not in allowlist_external_dirs")
+
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            raise ServiceValidationError(f"{path} is not a file")
+
+        filename = call.data.get(ATTR_FILENAME) or os.path.basename(path)
+
+        if not await coordinator.printer.upload(path, filename):
+            raise HomeAssistantError(f"Upload of {path} to the printer failed")
+
+    async def async_run_gcode(call: ServiceCall) -> ServiceResponse:
+        coordinator = coordinator_from_call(hass, call)
+        result = await coordinator.printer.run_gcode(call.data[ATTR_GCODE])
+
+        if result is None:
+            raise HomeAssistantError("Can not connect to the printer")
+
+        (replies, completed) = result
+
+        if not completed:
+            if not replies:
+                raise HomeAssistantError("The script did not run")
+
+            (command, lines) = replies[-1]
+            raise HomeAssistantError(
+                f"The script stopped at {command}: {' '.join(lines)}"
+            )
+
+        return {
+            "commands": [
+                {"command": command, "response": lines} for command, lines in replies
+            ]
+        }
+
+    async def async_start_capture(call: ServiceCall):
+        coordinator = coordinator_from_call(hass, call)
+        path = call.data[ATTR_PATH]
+
+        if not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"{path} is not in allowlist_external_dirs")
+
+        try:
+            await coordinator.printer.start_capture(path)
+        except OSError as e:
+            raise HomeAssistantError(f"Can not write {path}: {e}") from e
+
+    async def async_stop_capture(call: ServiceCall):
+        await coordinator_from_call(hass, call).printer.stop_capture()
+
+    async def async_preheat(call: ServiceCall):
+        coordinator = coordinator_from_call(hass, call)
+
+        if not await coordinator.printer.preheat(
+            call.data.get(ATTR_BED_TEMP),
+            call.data.get(ATTR_EXTRUDER_TEMP),
+            call.data[ATTR_STEPS],
+            call.data[ATTR_TOLERANCE],
+            call.data[ATTR_HOLD],
+            call.data[ATTR_TIMEOUT],
+        ):
+            raise HomeAssistantError("The printer did not reach the temperatures")
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_UPLOAD_GCODE, async_upload_gcode, UPLOAD_GCODE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_CAPTURE, async_start_capture, START_CAPTURE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_STOP_CAPTURE, async_stop_capture, STOP_CAPTURE_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_PREHEAT, async_preheat, PREHEAT_SCHEMA)
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RUN_GCODE,
+        async_run_gcode,
+        RUN_GCODE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -1,87 +1,758 @@
 import asyncio
+import heapq
+import os
+import random
+import socket
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import List, Callable
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Deque,
+    Dict,
+    List,
+    Callable,
+    Set,
+    Tuple,
+)
+
+from . import capture
+from .capture import Shui3dCaptureWriter, replay_capture
+from .framing import Shui3dLineBuffer
+from .history import Shui3dPrintEstimator, Shui3dTemperatureHistory
+from .metrics import Shui3dConnectionMetrics
+from .parser import Shui3dReport, Shui3dReportParser, parse_file_list
+from .upload import Shui3dUploadProgress, read_gcode_lines
 
 
 class GCode:
+    SET_BED_TEMP = "M140"
+    SET_EXTRUDER_TEMP = "M104"
     SD_PRINT_STATUS = "M27"
+    TEMPERATURES = "M105"
+    AUTO_REPORT_TEMPERATURES = "M155"
+    POSITION = "M114"
     BEEP_SOUND = "M300"
+    BEGIN_SD_WRITE = "M28"
+    END_SD_WRITE = "M29"
+    LIST_SD_FILES = "M20"
+    SELECT_SD_FILE = "M23"
+    START_SD_PRINT = "M24"
+    PAUSE_SD_PRINT = "M25"
+    ABORT_SD_PRINT = "M524"
+    EMERGENCY_STOP = "M112"
+    FEEDRATE = "M220"
+    FLOW = "M221"
 
 
 class Shui3dPrinterConnection:
     CONNECTION_TIMEOUT = 2
     READ_TIMEOUT = 4
-    DELAY_AFTER_CMD_WRITE = 4
+    RESPONSE_TIMEOUT = 30
+    BANNER_LINES = 4
+    # Marlin follows an error with the usual ok, only a halt ends a reply
+    # without one, as "Error:Printer halted. kill() called!" or "!!".
+    TERMINATORS = ("ok", "!!")
+    HALTED = "Printer halted"
+    RECEIVE_BUFFER = Shui3dLineBuffer.SIZE
+
+    # The kernel probes an idle session and gives up on unacked data, so a
+    # vanished printer closes the session within seconds without any G-code.
+    KEEPALIVE_IDLE = 5
+    KEEPALIVE_INTERVAL = 2
+    KEEPALIVE_COUNT = 3
+    USER_TIMEOUT = 10
 
     _ip: str
     _port: int
-    _reader: asyncio.StreamReader
-    _writer: asyncio.StreamWriter
+    _transport: asyncio.Transport | None = None
+    _protocol: "Shui3dPrinterConnection.Protocol | None" = None
+    _banner: List[str]
+    _banner_done: asyncio.Future | None = None
+    _lock: asyncio.Lock
+    _pending: Deque["Shui3dPrinterConnection.Response"]
+    _receive: Shui3dLineBuffer
+    _listener: Callable[[bytearray, int, int], None] | None = None
+    _lost_listener: Callable[[], None] | None = None
+    _capture: Shui3dCaptureWriter | None = None
+    _session: int = 0
+    # Reads of the session so far, tells silence apart from a slow reply
+    _reads: int = 0
+    _metrics: Shui3dConnectionMetrics
 
     class CanNotConnect:
         pass
 
-    def __init__(self, ip: str, port: int):
+    class TimedOut(CanNotConnect):
+        # The printer stopped acking, the session was dropped
+        pass
+
+    class Response:
+        lines: List[str]
+        done: asyncio.Future
+        lost: bool = False
+        sent: float = 0.0
+
+        def __init__(self):
+            self.lines = []
+            self.done = asyncio.get_running_loop().create_future()
+
+        def finish(self, lost: bool = False):
+            self.lost = lost
+
+            if not self.done.done():
+                self.done.set_result(None)
+
+    class Protocol(asyncio.BufferedProtocol):
+        # The transport reads straight into the connection's line buffer
+        _paused: bool = False
+        _drained: asyncio.Future | None = None
+        _reading: memoryview | None = None
+
+        def __init__(self, connection: "Shui3dPrinterConnection"):
+            self._connection = connection
+            self.closed = asyncio.get_running_loop().create_future()
+
+        def connection_made(self, transport: asyncio.Transport):
+            # The banner may arrive before create_connection returns
+            self._connection._transport = transport
+            self._connection._protocol = self
+
+            if self._connection._capture is not None:
+                self._connection._capture.record(capture.OPENED)
+
+            sock = transport.get_extra_info("socket")
+
+            if sock is not None:
+                Shui3dPrinterConnection.enable_keepalive(sock)
+
+        def get_buffer(self, sizehint: int) -> memoryview:
+            self._reading = self._connection._receive.writable()
+            return self._reading
+
+        def buffer_updated(self, nbytes: int):
+            if self._connection._protocol is not self:
+                return
+
+            if self._connection._capture is not None:
+                self._connection._capture.record(
+                    capture.RECEIVED, self._reading[:nbytes]
+                )
+
+            self._connection._received(nbytes)
+
+        def connection_lost(self, exc: Exception | None):
+            if self._connection._protocol is self:
+                self._connection._drop()
+                self._connection._lost()
+
+            self.resume_writing()
+
+            if not self.closed.done():
+                self.closed.set_result(None)
+
+        def pause_writing(self):
+            self._paused = True
+
+        def resume_writing(self):
+            self._paused = False
+
+            if self._drained is not None and not self._drained.done():
+                self._drained.set_result(None)
+
+        async def drain(self):
+            if self.closed.done():
+                raise ConnectionResetError()
+
+            if not self._paused:
+                return
+
+            self._drained = asyncio.get_running_loop().create_future()
+            await self._drained
+
+            if self.closed.done():
+                raise ConnectionResetError()
+
+    def __init__(self, ip: str, port: int, buffer_size: int = RECEIVE_BUFFER):
         self._ip = ip
         self._port = port
+        self._banner = []
+        self._lock = asyncio.Lock()
+        self._pending = deque()
+        self._receive = Shui3dLineBuffer(buffer_size)
+        self._metrics = Shui3dConnectionMetrics()
 
-    async def read_all(self, chunk_size: int = 10000):
-        data = await self._reader.read(chunk_size)
+    def is_open(self) -> bool:
+        return self._transport is not None and not self._transport.is_closing()
 
-        return data.decode()
+    def banner(self) -> List[str]:
+        return self._banner
 
-    async def read_lines(self, count: int):
-        lines: List[str] = []
+    def session(self) -> int:
+        return self._session
 
-        for _ in range(count):
-            line: str = (await self._reader.readline()).decode()
-            sublines = line.split("\n")
+    def metrics(self) -> Shui3dConnectionMetrics:
+        return self._metrics
 
-            for subline in sublines:
-                if len(subline):
-                    lines.append(subline)
+    def capture(self) -> Shui3dCaptureWriter | None:
+        return self._capture
 
-        return lines
+    def receive_overflows(self) -> int:
+        return self._receive.overflows
 
-    async def exec(self, snippet: str) -> List[str] | CanNotConnect:
+    def set_lost_listener(self, listener: Callable[[], None] | None):
+        # Called when an established session breaks, not when it is closed
+        self._lost_listener = listener
+
+    def _lost(self):
+        if self._lost_listener is not None:
+            try:
+                self._lost_listener()
+            except Exception:
+                pass
+
+    @staticmethod
+    def enable_keepalive(sock: socket.socket):
         try:
-            (self._reader, self._writer) = await asyncio.wait_for(
-                asyncio.open_connection(self._ip, self._port),
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+            # Per socket timings are platform specific, use what is there
+            for option, value in (
+                ("TCP_KEEPIDLE", Shui3dPrinterConnection.KEEPALIVE_IDLE),
+                ("TCP_KEEPINTVL", Shui3dPrinterConnection.KEEPALIVE_INTERVAL),
+                ("TCP_KEEPCNT", Shui3dPrinterConnection.KEEPALIVE_COUNT),
+                ("TCP_USER_TIMEOUT", Shui3dPrinterConnection.USER_TIMEOUT * 1000),
+            ):
+                if hasattr(socket, option):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        except OSError:
+            pass
+
+    def set_capture(self, writer: Shui3dCaptureWriter | None):
+        # Everything sent and received from now on is recorded by the writer
+        self._capture = writer
+
+        if writer is not None and self.is_open():
+            writer.record(capture.OPENED)
+
+    def feed(self, data: bytes):
+        """Process data as if it was received on the session, for replays."""
+        view = memoryview(data)
+
+        while len(view):
+            writable = self._receive.writable()
+            n = min(len(writable), len(view))
+            writable[:n] = view[:n]
+            view = view[n:]
+            self._received(n)
+
+    def _send(self, transport: asyncio.Transport, data: bytes):
+        self._metrics.bytes_out += len(data)
+
+        if self._capture is not None:
+            self._capture.record(capture.SENT, data)
+
+        transport.write(data)
+
+    def set_data_listener(
+        self, listener: Callable[[bytearray, int, int], None] | None
+    ):
+        # The listener gets the complete lines of every read as a range of the
+        # receive buffer, it is only valid for the duration of the call.
+        self._listener = listener
+
+    @staticmethod
+    def is_terminator(line: str) -> bool:
+        return line.startswith(Shui3dPrinterConnection.TERMINATORS) or (
+            line.startswith("Error") and Shui3dPrinterConnection.HALTED in line
+        )
+
+    async def read_response(
+        self, response: Response, timeout: float | None = RESPONSE_TIMEOUT
+    ):
+        # READ_TIMEOUT bounds the silence of the session, so busy keepalives
+        # of a long running command keep the response alive up to timeout,
+        # or for as long as they keep coming without one. Lines of the
+        # commands ahead of this one count as well, its own only start once
+        # they are done.
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        while True:
+            received = self._reads
+
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(response.done), Shui3dPrinterConnection.READ_TIMEOUT
+                )
+                break
+            except asyncio.TimeoutError:
+                if self._reads == received or (
+                    deadline is not None and loop.time() >= deadline
+                ):
+                    raise
+
+        if response.lost:
+            raise ConnectionResetError()
+
+    def _received(self, nbytes: int):
+        self._metrics.bytes_in += nbytes
+        self._reads += 1
+
+        receive = self._receive
+        receive.commit(nbytes)
+        (start, end) = receive.frame()
+
+        if start == end:
+            return
+
+        data = receive.data()
+
+        # The listener sees every line, solicited or not, the oldest
+        # pending command additionally collects lines until its terminator.
+        if self._listener is not None:
+            try:
+                self._listener(data, start, end)
+            except Exception:
+                pass
+
+        # Nobody waits for unsolicited lines, skip decoding them
+        if not self._pending and self._banner_done is None:
+            return
+
+        view = receive.view()
+
+        while start < end:
+            newline = data.find(b"\n", start, end)
+            line = str(view[start:newline], "utf-8", "replace").strip()
+            start = newline + 1
+
+            if not len(line):
+                continue
+
+            if self._banner_done is not None:
+                self._banner.append(line)
+
+                if len(self._banner) == Shui3dPrinterConnection.BANNER_LINES:
+                    self._banner_done.set_result(None)
+                    self._banner_done = None
+
+                continue
+
+            if not self._pending:
+                break
+
+            response = self._pending[0]
+
+            if not response.lines:
+                self._metrics.first_byte.add(time.monotonic() - response.sent)
+
+            response.lines.append(line)
+
+            if Shui3dPrinterConnection.is_terminator(line):
+                self._pending.popleft()
+                self._metrics.command_latency.add(time.monotonic() - response.sent)
+                response.finish()
+
+    async def open(self) -> bool:
+        if self.is_open():
+            return True
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+
+        # The WiFi module greets every new session, the first lines go to the
+        # banner so that command responses only contain what the printer replied.
+        self._receive.clear()
+        self._banner = []
+        self._banner_done = banner = loop.create_future()
+
+        try:
+            await asyncio.wait_for(
+                loop.create_connection(
+                    lambda: Shui3dPrinterConnection.Protocol(self),
+                    self._ip,
+                    self._port,
+                ),
                 Shui3dPrinterConnection.CONNECTION_TIMEOUT,
             )
         except Exception:
-            return Shui3dPrinterConnection.CanNotConnect()
+            self._transport = None
+            self._protocol = None
+            self._banner_done = None
+            self._metrics.connect_failures += 1
+            return False
+
+        try:
+            await asyncio.wait_for(banner, Shui3dPrinterConnection.READ_TIMEOUT)
+        except Exception:
+            await self.close()
+            self._metrics.connect_failures += 1
+            return False
+
+        self._metrics.connect_time.add(time.monotonic() - started)
+        self._metrics.sessions += 1
 
-        lines: List[str] = []
+        if self._session:
+            self._metrics.reconnects += 1
+
+        self._session += 1
+
+        return True
+
+    def _drop(self) -> "Shui3dPrinterConnection.Protocol | None":
+        transport = self._transport
+        protocol = self._protocol
+
+        self._transport = None
+        self._protocol = None
+        self._receive.clear()
+
+        if self._banner_done is not None:
+            self._banner_done.cancel()
+            self._banner_done = None
+
+        while self._pending:
+            self._pending.popleft().finish(lost=True)
+
+        if transport is not None:
+            transport.close()
+
+            if self._capture is not None:
+                self._capture.record(capture.CLOSED)
+
+        return protocol
+
+    async def close(self):
+        protocol = self._drop()
+
+        if protocol is None:
+            return
 
         try:
-            lines = await asyncio.wait_for(
-                self.read_lines(4), Shui3dPrinterConnection.READ_TIMEOUT
+            await asyncio.wait_for(
+                asyncio.shield(protocol.closed), Shui3dPrinterConnection.READ_TIMEOUT
             )
-        except Exception as e:
-            return lines + [type(e).__name__]
+        except Exception:
+            pass
+
+    async def exec(self, snippet: str) -> List[str] | CanNotConnect:
+        responses = await self.exec_batch([snippet])
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return responses
+
+        return responses[0]
+
+    async def exec_batch(self, snippets: List[str]) -> List[List[str]] | CanNotConnect:
+        async with self._lock:
+            # A reused session may have been dropped by the module while idle,
+            # in that case reconnect once and resend instead of failing the command.
+            reused = self.is_open()
+
+            responses = await self._exec_batch(snippets)
+
+            # A printer that stopped acking is not helped by a new session
+            if (
+                reused
+                and isinstance(responses, Shui3dPrinterConnection.CanNotConnect)
+                and not isinstance(responses, Shui3dPrinterConnection.TimedOut)
+            ):
+                responses = await self._exec_batch(snippets)
+
+            return responses
+
+    async def _exec_batch(
+        self, snippets: List[str]
+    ) -> List[List[str]] | CanNotConnect:
+        if not await self.open():
+            return Shui3dPrinterConnection.CanNotConnect()
+
+        # All commands go out in one write, the firmware acks them in order,
+        # so the n-th terminator closes the response of the n-th command.
+        responses = [Shui3dPrinterConnection.Response() for _ in snippets]
+        self._pending.extend(responses)
+
+        data = "".join(s + "\n\r" for s in snippets).encode()
+        sent = time.monotonic()
+
+        for response in responses:
+            response.sent = sent
+
+        self._metrics.commands += len(snippets)
 
         try:
-            self._writer.write((snippet + "\n\r").encode())
-            await self._writer.drain()
-        except Exception as e:
-            return lines + [type(e).__name__]
+            self._send(self._transport, data)
+            await self._protocol.drain()
+        except Exception:
+            await self.close()
+            return Shui3dPrinterConnection.CanNotConnect()
+
+        for response in responses:
+            try:
+                await self.read_response(response)
+            except ConnectionError:
+                await self.close()
+                return Shui3dPrinterConnection.CanNotConnect()
+            except Exception:
+                # The ack never came, the session can not be trusted to be in sync anymore
+                await self.close()
+                self._metrics.timeouts += 1
+                return Shui3dPrinterConnection.TimedOut()
+
+        return [response.lines for response in responses]
+
+    async def exec_urgent(self, snippet: str) -> List[str] | CanNotConnect:
+        # Goes out on the open session right away, next to whatever batch or
+        # stream holds the lock. Acks come back in send order, so the command
+        # simply takes the next place in the pending responses.
+        if not self.is_open() or self._banner_done is not None:
+            return Shui3dPrinterConnection.CanNotConnect()
 
-        await asyncio.sleep(Shui3dPrinterConnection.DELAY_AFTER_CMD_WRITE)
+        response = Shui3dPrinterConnection.Response()
+        response.sent = time.monotonic()
+        self._pending.append(response)
+        self._metrics.commands += 1
+        self._send(self._transport, (snippet + "\n\r").encode())
 
         try:
-            buffer = await asyncio.wait_for(
-                self.read_all(), Shui3dPrinterConnection.READ_TIMEOUT
-            )
+            await self.read_response(response)
+        except ConnectionError:
+            return Shui3dPrinterConnection.CanNotConnect()
+        except Exception:
+            await self.close()
+            self._metrics.timeouts += 1
+            return Shui3dPrinterConnection.TimedOut()
+
+        return response.lines
+
+    def abort(self, snippet: str):
+        # Last words for a printer that will not ack them, the session is
+        # dropped right after and everything in flight fails with it.
+        if self.is_open():
+            self._metrics.commands += 1
+            self._send(self._transport, (snippet + "\n\r").encode())
+
+        self._drop()
+
+    async def exec_stream(
+        self,
+        snippets: AsyncIterator[str],
+        window: int,
+        on_response: Callable[[str, List[str]], bool] | None = None,
+        timeout: float | None = RESPONSE_TIMEOUT,
+    ) -> bool | CanNotConnect:
+        # Up to window commands are in flight, every ack lets the next one out.
+        # on_response sees each command with its reply and may return False to
+        # stop sending, the result tells whether the whole stream went through.
+        # A command left unanswered is passed on with the timeout appended.
+        async with self._lock:
+            if not await self.open():
+                return Shui3dPrinterConnection.CanNotConnect()
+
+            transport = self._transport
+            protocol = self._protocol
+            in_flight: Deque[Tuple[str, Shui3dPrinterConnection.Response]] = deque()
+            completed = True
 
-            lines = lines + buffer.split("\n")
-        except Exception as e:
-            return lines + [type(e).__name__]
+            try:
+                async for snippet in snippets:
+                    if len(in_flight) >= window:
+                        completed = await self._finish_oldest(
+                            in_flight, on_response, timeout
+                        )
+
+                        if not completed:
+                            break
+
+                    response = Shui3dPrinterConnection.Response()
+                    response.sent = time.monotonic()
+                    self._pending.append(response)
+                    in_flight.append((snippet, response))
+
+                    data = (snippet + "\n\r").encode()
+                    self._metrics.commands += 1
+                    self._send(transport, data)
+                    await protocol.drain()
+
+                while in_flight:
+                    finished = await self._finish_oldest(
+                        in_flight, on_response, timeout
+                    )
+                    completed = finished and completed
+            except ConnectionError:
+                await self.close()
+                return Shui3dPrinterConnection.CanNotConnect()
+            except Exception as e:
+                # A missing ack or a failing source, either way the session
+                # is out of step with what was sent.
+                await self.close()
+
+                if isinstance(e, asyncio.TimeoutError):
+                    self._metrics.timeouts += 1
+
+                return False
 
-        await self._writer.drain()
-        self._writer.close()
-        await self._writer.wait_closed()
-        return lines
+            return completed
+
+    async def _finish_oldest(
+        self,
+        in_flight: Deque[Tuple[str, "Shui3dPrinterConnection.Response"]],
+        on_response: Callable[[str, List[str]], bool] | None,
+        timeout: float | None,
+    ) -> bool:
+        (snippet, response) = in_flight.popleft()
+
+        try:
+            await self.read_response(response, timeout)
+        except asyncio.TimeoutError as e:
+            response.lines.append(type(e).__name__)
+
+            if on_response is not None:
+                on_response(snippet, response.lines)
+
+            raise
+
+        if on_response is None:
+            return True
+
+        return on_response(snippet, response.lines) is not False
+
+
+class Shui3dCommandPriority:
+    URGENT = 0
+    USER = 1
+    POLL = 2
+
+
+class Shui3dCommandQueue:
+    _connection: Shui3dPrinterConnection
+    _heap: List[Tuple[int, int, "Shui3dCommandQueue.Command"]]
+    _keyed: Dict[str, "Shui3dCommandQueue.Command"]
+    _sequence: int = 0
+    _worker: asyncio.Task | None = None
+    _running: "Shui3dCommandQueue.Command | None" = None
+
+    class Command:
+        snippets: List[str]
+        key: str | None
+        call: Callable[[Shui3dPrinterConnection], Awaitable] | None = None
+        done: asyncio.Future
+
+        def __init__(self, snippets: List[str], key: str | None):
+            self.snippets = snippets
+            self.key = key
+            self.done = asyncio.get_running_loop().create_future()
+
+    def __init__(self, connection: Shui3dPrinterConnection):
+        self._connection = connection
+        self._heap = []
+        self._keyed = {}
+
+    async def submit(
+        self, snippets: List[str], priority: int, key: str | None = None
+    ) -> List[List[str]] | Shui3dPrinterConnection.CanNotConnect:
+        # A keyed command still waiting in the queue is superseded in place,
+        # so a burst of setpoints for one heater goes out as its last value.
+        command = self._keyed.get(key) if key is not None else None
+
+        if command is not None:
+            command.snippets = snippets
+        else:
+            command = Shui3dCommandQueue.Command(snippets, key)
+            self._push(command, priority)
+
+        return await asyncio.shield(command.done)
+
+    async def run(
+        self, call: Callable[[Shui3dPrinterConnection], Awaitable], priority: int
+    ):
+        # Exclusive use of the connection for exchanges that are not a batch
+        command = Shui3dCommandQueue.Command([], None)
+        command.call = call
+        self._push(command, priority)
+
+        return await asyncio.shield(command.done)
+
+    async def express(
+        self, snippet: str
+    ) -> List[str] | Shui3dPrinterConnection.CanNotConnect:
+        # Skips the queue on an open session, otherwise it is the next command
+        # to go out once the session is back.
+        if self._connection.is_open():
+            lines = await self._connection.exec_urgent(snippet)
+
+            # Sent but never acked, resending it later could do more harm
+            if not isinstance(
+                lines, Shui3dPrinterConnection.CanNotConnect
+            ) or isinstance(lines, Shui3dPrinterConnection.TimedOut):
+                return lines
+
+        responses = await self.submit([snippet], Shui3dCommandPriority.URGENT)
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return responses
+
+        return responses[0]
+
+    def _push(self, command: "Shui3dCommandQueue.Command", priority: int):
+        self._sequence += 1
+        heapq.heappush(self._heap, (priority, self._sequence, command))
+
+        if command.key is not None:
+            self._keyed[command.key] = command
+
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self._heap:
+            (_, _, command) = heapq.heappop(self._heap)
+
+            if command.key is not None:
+                self._keyed.pop(command.key, None)
+
+            self._running = command
+
+            try:
+                if command.call is not None:
+                    result = await command.call(self._connection)
+                else:
+                    result = await self._connection.exec_batch(command.snippets)
+            except Exception:
+                result = Shui3dPrinterConnection.CanNotConnect()
+
+            self._running = None
+
+            if not command.done.done():
+                command.done.set_result(result)
+
+        self._worker = None
+
+    async def close(self):
+        worker = self._worker
+        self._worker = None
+
+        if worker is not None:
+            worker.cancel()
+
+        # The command the worker was on already left the heap, its caller
+        # would otherwise wait forever.
+        commands = [command for _, _, command in self._heap]
+
+        if self._running is not None:
+            commands.append(self._running)
+            self._running = None
+
+        for command in commands:
+            if not command.done.done():
+                command.done.set_result(Shui3dPrinterConnection.CanNotConnect())
+
+        self._heap.clear()
+        self._keyed.clear()
 
 
 class Shui3dPrinterConnectionStatus(Enum):
@@ -99,8 +770,55 @@ def StdLogger(message: str):
     print(message)
 
 
+class Shui3dChangeFilter:
+    """Publishes a getter's value only once it moved past the deadband.
+
+    Numbers are compared against the last published value, so a slow drift
+    is published as soon as it adds up, anything else on every change.
+    """
+
+    _UNSET = object()
+
+    _getter: Callable[[], Any]
+    _deadband: float
+    _published: Any = _UNSET
+
+    def __init__(self, getter: Callable[[], Any], deadband: float = 0):
+        self._getter = getter
+        self._deadband = deadband
+
+    def changed(self) -> bool:
+        value = self._getter()
+        published = self._published
+
+        if published is Shui3dChangeFilter._UNSET:
+            changed = True
+        elif (
+            self._deadband
+            and Shui3dChangeFilter._is_number(value)
+            and Shui3dChangeFilter._is_number(published)
+        ):
+            changed = abs(value - published) >= self._deadband
+        else:
+            changed = value != published
+
+        if changed:
+            self._published = value
+
+        return changed
+
+    @staticmethod
+    def _is_number(value: Any) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 class Shui3dPrinter:
-    FAILS_TO_DISCONNECT = 3
+    RECONNECT_MIN_DELAY = 1
+    RECONNECT_MAX_DELAY = 300
+
+    PUSH_TEMPERATURES_INTERVAL = 1
+    PUSH_SD_STATUS_INTERVAL = 2
+    PUSH_STALE_AFTER = 10
 
     _bed_temp: float = 0
     _target_bed_temp: float = 0
@@ -108,134 +826,783 @@ class Shui3dPrinter:
     _extruder_temp: float = 0
     _target_extruder_temp: float = 0
 
+    _bed_history: Shui3dTemperatureHistory
+    _extruder_history: Shui3dTemperatureHistory
+
+    _position: List[float] | None = None
+    _feedrate: float | None = None
+    _flow: float | None = None
+
     _print_progress: float = 0
+    _print_estimator: Shui3dPrintEstimator
     _print_status: Shui3dPrintStatus = Shui3dPrintStatus.Idle
     _print_status_diff: int = 0
 
     DIFF_TO_CHANGE = 3
+    HEATING_TOLERANCE = 2
+
+    # Smallest move of a value worth publishing, keyed by getter name,
+    # getters not listed here publish every change.
+    DEADBANDS: Dict[str, float] = {
+        "bed_temp": 0.5,
+        "extruder_temp": 0.5,
+        "print_progress": 0.5,
+        "print_time_remaining": 30,
+        "print_throughput": 50,
+        "bed_heating_rate": 0.5,
+        "extruder_heating_rate": 0.5,
+        "bed_temp_stability": 0.1,
+        "extruder_temp_stability": 0.1,
+        "bed_time_to_target": 10,
+        "extruder_time_to_target": 10,
+        "upload_progress": 1,
+        "upload_rate": 1024,
+    }
+
+    # Marlin keeps BUFSIZE = 4 commands, more in flight only queue up in
+    # the serial buffer of the module and risk overflowing it
+    UPLOAD_WINDOW = 4
+    UPLOAD_CHUNK = 64 * 1024
+    UPLOAD_NOTIFY_INTERVAL = 1
+    SCRIPT_WINDOW = 4
+    # Heating and homing keep a command running for minutes, only silence
+    # ends it early. The cap is there because auto reports keep arriving
+    # even for a command the printer will never ack.
+    SCRIPT_COMMAND_TIMEOUT = 30 * 60
+
+    # Queries of the optional values, only sent while someone wants them
+    TELEMETRY: Dict[str, str] = {
+        "position": GCode.POSITION,
+        "feedrate": GCode.FEEDRATE,
+        "flow": GCode.FLOW,
+    }
+
+    # Seconds both heaters have to stay within tolerance for a preheat to
+    # count as done, and how long it may take altogether
+    PREHEAT_HOLD = 10
+    PREHEAT_TIMEOUT = 30 * 60
 
     _status: Shui3dPrinterConnectionStatus = Shui3dPrinterConnectionStatus.Disconnected
+    _stale: bool = False
 
-    _update: bool = False
-    _update_connection: Shui3dPrinterConnection
+    _update_task: asyncio.Future | None = None
+    _reconnect_task: asyncio.Task | None = None
+    _closed: bool = False
+    _fleet: "Shui3dPrinterFleet | None" = None
+    _connection: Shui3dPrinterConnection
+    _queue: Shui3dCommandQueue
 
     _logger: Callable[[str], None]
 
     _disconnected: int = 0
 
-    def __init__(self, ip: str, port: int, logger: Callable[[str], None] = StdLogger):
+    _push: bool = False
+    _push_session: int = 0
+    _push_busy: bool = False
+    _last_report: float = 0
+
+    _upload: Shui3dUploadProgress | None = None
+
+    # SD card files and sizes, None until listed and after the card changed
+    _catalog: Dict[str, int | None] | None = None
+    _catalog_wanted: bool = False
+    _catalog_task: asyncio.Task | None = None
+    _selected_file: str | None = None
+
+    _telemetry: Dict[str, int]
+
+    _listeners: List[Callable[[], None]]
+    _deadbands: Dict[str, float]
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        logger: Callable[[str], None] = StdLogger,
+        push: bool = False,
+        deadbands: Dict[str, float] | None = None,
+        fleet: "Shui3dPrinterFleet | None" = None,
+    ):
         self._ip = ip
         self._port = port
+        self._fleet = fleet
         self._logger = logger
-        self._update_connection = Shui3dPrinterConnection(ip, port)
+        self._connection = Shui3dPrinterConnection(ip, port)
+        self._queue = Shui3dCommandQueue(self._connection)
+        self._push = push
+        self._telemetry = {}
+        self._listeners = []
+        self._deadbands = {**Shui3dPrinter.DEADBANDS, **(deadbands or {})}
+        self._bed_history = Shui3dTemperatureHistory()
+        self._extruder_history = Shui3dTemperatureHistory()
+        self._print_estimator = Shui3dPrintEstimator()
+        self._connection.set_lost_listener(self._on_session_lost)
+
+        if push:
+            self._connection.set_data_listener(self._on_report)
+        else:
+            self._connection.set_data_listener(self._on_card_event)
 
     def log(self, message: str):
         self._logger(message)
 
+    def ip(self) -> str:
+        return self._ip
+
+    async def close(self):
+        self._closed = True
+        await self.stop_capture()
+
+        if self._catalog_task is not None:
+            self._catalog_task.cancel()
+            self._catalog_task = None
+
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+
+        await self._queue.close()
+        await self._connection.close()
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+
+        return lambda: self._listeners.remove(listener)
+
+    def notify(self):
+        for listener in list(self._listeners):
+            listener()
+
+    def change_filter(self, getter: Callable[[], Any]) -> Shui3dChangeFilter:
+        name = getattr(getter, "__name__", "")
+
+        return Shui3dChangeFilter(getter, self._deadbands.get(name, 0))
+
     async def beep(self):
         await self.exec_with_state_update(GCode.BEEP_SOUND)
 
-    async def update(self):
-        lines = await self._update_connection.exec(GCode.SD_PRINT_STATUS)
+    async def upload(self, path: str, name: str) -> bool:
+        """Stream a local G-code file to the SD card as name."""
+        if self._upload is not None and self._upload.is_running():
+            self.log(f"Upload of {self._upload.name} is still running")
+            return False
 
-        if isinstance(lines, Shui3dPrinterConnection.CanNotConnect):
-            self._disconnected += 1
+        size = await asyncio.get_running_loop().run_in_executor(
+            None, os.path.getsize, path
+        )
+        progress = Shui3dUploadProgress(name, size)
+        self._upload = progress
+        self.notify()
+
+        result = await self._queue.run(
+            lambda connection: self._upload_with(connection, path, progress),
+            Shui3dCommandPriority.USER,
+        )
+        succeeded = result is True
+
+        progress.finish(succeeded)
+
+        if succeeded:
+            self._add_to_catalog(name, progress.size)
+        self.log(
+            f"Upload of {name} {'finished' if succeeded else 'failed'}, "
+            f"{progress.position} bytes at {progress.rate()} B/s"
+        )
+        self.notify()
+
+        return succeeded
+
+    async def _upload_with(
+        self,
+        connection: Shui3dPrinterConnection,
+        path: str,
+        progress: Shui3dUploadProgress,
+    ) -> bool | Shui3dPrinterConnection.CanNotConnect:
+        begin = await connection.exec(f"{GCode.BEGIN_SD_WRITE} {progress.name}")
+
+        if isinstance(begin, Shui3dPrinterConnection.CanNotConnect):
+            return begin
+
+        if Shui3dPrinter._is_failure(begin):
+            self.log(f"Can not open {progress.name} on SD: {begin}")
+            return False
+
+        notified = time.monotonic()
+
+        def on_response(snippet: str, lines: List[str]) -> bool:
+            nonlocal notified
+
+            if Shui3dPrinter._is_failure(lines):
+                self.log(f"Printer rejected '{snippet}': {lines}")
+                return False
+
+            now = time.monotonic()
+
+            if now - notified >= Shui3dPrinter.UPLOAD_NOTIFY_INTERVAL:
+                notified = now
+                self.notify()
+
+            return True
+
+        try:
+            result = await connection.exec_stream(
+                read_gcode_lines(path, progress, Shui3dPrinter.UPLOAD_CHUNK),
+                Shui3dPrinter.UPLOAD_WINDOW,
+                on_response,
+            )
+        finally:
+            # The file has to be closed even after a failure, otherwise the
+            # printer keeps writing every following command into it.
+            end = await connection.exec(GCode.END_SD_WRITE)
+
+        if isinstance(end, Shui3dPrinterConnection.CanNotConnect):
+            return end
+
+        return result
+
+    async def run_gcode(
+        self, script: str
+    ) -> Tuple[List[Tuple[str, List[str]]], bool] | None:
+        """Run a multi-line script, returns every command with its reply.
+
+        Sending stops at the first command the printer rejects or leaves
+        unanswered, the flag tells whether the whole script went through.
+        None means the printer could not be reached.
+        """
+        snippets = [line.split(";", 1)[0].strip() for line in script.splitlines()]
+        replies: List[Tuple[str, List[str]]] = []
+
+        async def source():
+            for snippet in snippets:
+                if snippet:
+                    yield snippet
+
+        def on_response(snippet: str, lines: List[str]) -> bool:
+            replies.append((snippet, lines))
+            self.update_values_from(lines)
+
+            return not Shui3dPrinter._is_failure(lines)
+
+        result = await self._queue.run(
+            lambda connection: connection.exec_stream(
+                source(),
+                Shui3dPrinter.SCRIPT_WINDOW,
+                on_response,
+                Shui3dPrinter.SCRIPT_COMMAND_TIMEOUT,
+            ),
+            Shui3dCommandPriority.USER,
+        )
+
+        if isinstance(result, Shui3dPrinterConnection.CanNotConnect):
+            return None
+
+        self.notify()
+
+        return (replies, result)
+
+    @staticmethod
+    def _is_failure(lines: List[str]) -> bool:
+        # A reply that does not end in its terminator timed out or was cut off
+        if not lines or not Shui3dPrinterConnection.is_terminator(lines[-1]):
+            return True
+
+        return any(
+            line.startswith(("Error", "!!")) or "open failed" in line
+            for line in lines
+        )
+
+    async def start_capture(self, path: str):
+        await self.stop_capture()
+
+        writer = Shui3dCaptureWriter(path)
+        await writer.open()
+        self._connection.set_capture(writer)
+        self.log(f"Capturing the printer session to {path}")
+
+    async def stop_capture(self):
+        writer = self._connection.capture()
+
+        if writer is None:
+            return
+
+        self._connection.set_capture(None)
+        await writer.close()
+        self.log(f"Capture {writer.path()} closed")
+
+    async def replay(self, path: str, speed: float = 0) -> int:
+        """Feed a capture through the receive path and the report parser.
+
+        Captured replies are handled like auto reports, every SD status
+        closes one period of the status state machine, which is enough to
+        reproduce what the firmware output does to it.
+        """
+        self._status = Shui3dPrinterConnectionStatus.Connected
+        self._connection.set_data_listener(self._on_report)
+
+        return await replay_capture(path, self._connection.feed, speed)
+
+    def want_catalog(self, wanted: bool = True):
+        # Listing a big card is slow, only printers someone looks at list theirs
+        self._catalog_wanted = wanted
+
+        if wanted and self.is_connected():
+            self._schedule_catalog_refresh()
+
+    def want_telemetry(self, name: str, wanted: bool = True):
+        # Counted, several entities may show parts of the same reply
+        count = self._telemetry.get(name, 0) + (1 if wanted else -1)
+
+        if count > 0:
+            self._telemetry[name] = count
         else:
-            self.update_from(lines)
-            self._disconnected = 0
-            self._status = Shui3dPrinterConnectionStatus.Connected
+            self._telemetry.pop(name, None)
 
-        if self._disconnected >= Shui3dPrinter.FAILS_TO_DISCONNECT:
-            self._status = Shui3dPrinterConnectionStatus.Disconnected
-            self._print_status_diff = 0
-            self._print_status = Shui3dPrintStatus.Idle
+    def _telemetry_gcodes(self) -> List[str]:
+        return [
+            gcode
+            for name, gcode in Shui3dPrinter.TELEMETRY.items()
+            if name in self._telemetry
+        ]
 
-    async def ensure_update(self):
-        if self._update:
-            return await self.wait_for_update()
+    def catalog(self) -> List[str]:
+        return [] if self._catalog is None else sorted(self._catalog)
+
+    def catalog_size(self, name: str) -> int | None:
+        return None if self._catalog is None else self._catalog.get(name)
 
-        self._update = True
+    def invalidate_catalog(self):
+        self._catalog = None
 
+        if self._catalog_wanted and self.is_connected():
+            self._schedule_catalog_refresh()
+
+    def _add_to_catalog(self, name: str, size: int):
+        # The card keeps 8.3 names upper case, anything longer gets a short
+        # name only the firmware knows, so list the card again for those.
+        (stem, _, extension) = name.partition(".")
+
+        if self._catalog is not None and len(stem) <= 8 and len(extension) <= 3:
+            self._catalog[name.upper()] = size
+            self.notify()
+        else:
+            self.invalidate_catalog()
+
+    def _schedule_catalog_refresh(self):
+        if self._catalog_task is None and not self._closed:
+            self._catalog_task = asyncio.get_running_loop().create_task(
+                self.refresh_catalog()
+            )
+
+    async def refresh_catalog(self) -> bool:
         try:
-            await self.update()
-        except Exception:
-            pass
+            responses = await self._queue.submit(
+                [GCode.LIST_SD_FILES],
+                Shui3dCommandPriority.POLL,
+                GCode.LIST_SD_FILES,
+            )
+
+            if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+                return False
+
+            self._catalog = parse_file_list(responses[0])
+            self.notify()
+
+            return True
+        finally:
+            if self._catalog_task is asyncio.current_task():
+                self._catalog_task = None
+
+    def selected_file(self) -> str | None:
+        return self._selected_file
+
+    def select_file(self, name: str):
+        self._selected_file = name
 
-        self._update = False
+    async def start_print(self, name: str | None = None) -> bool:
+        name = name or self._selected_file
 
-    async def wait_for_update(self):
-        while self._update:
-            await asyncio.sleep(0.016)
+        if not name:
+            self.log("No SD file selected to print")
+            return False
+
+        if not await self.exec_with_state_update(f"{GCode.SELECT_SD_FILE} {name}"):
+            self.log(f"Printer did not open {name}")
+            return False
+
+        return await self.exec_with_state_update(GCode.START_SD_PRINT)
 
-    async def _exec_with_state_update(self, gcode: str) -> bool:
-        lines = await Shui3dPrinterConnection(self._ip, self._port).exec(gcode)
+    async def pause_print(self) -> bool:
+        return await self._exec_urgent(GCode.PAUSE_SD_PRINT)
+
+    async def resume_print(self) -> bool:
+        return await self._exec_urgent(GCode.START_SD_PRINT)
+
+    async def cancel_print(self) -> bool:
+        return await self._exec_urgent(GCode.ABORT_SD_PRINT)
+
+    def emergency_stop(self):
+        # The firmware halts on M112 without an ack and needs a reset, so
+        # nothing waits for it and the session goes down with the printer.
+        # The backoff reconnect picks the printer up again after the reset.
+        self.log("Emergency stop")
+        self._connection.abort(GCode.EMERGENCY_STOP)
+        self._mark_disconnected()
+        self._start_reconnect()
+
+    async def _exec_urgent(self, gcode: str) -> bool:
+        # Between M28 and M29 the firmware writes every line into the file,
+        # an urgent command would end up there instead of being run.
+        if self.is_uploading():
+            self.log(f"Can not send {gcode} while {self._upload.name} is uploaded")
+            return False
+
+        lines = await self._queue.express(gcode)
+
+        if isinstance(lines, Shui3dPrinterConnection.TimedOut):
+            self.log(f"Printer did not confirm {gcode}")
+            return False
 
         if isinstance(lines, Shui3dPrinterConnection.CanNotConnect):
             return False
 
         self.update_values_from(lines)
+        self.notify()
+
+        # A command the printer never acked may not have been run at all
+        if Shui3dPrinter._is_failure(lines):
+            self.log(f"Printer did not confirm {gcode}: {lines}")
+            return False
 
         return True
 
-    async def exec_with_state_update(self, gcode: str) -> bool:
-        return await self._exec_with_state_update(gcode)
+    async def update(self):
+        # An upload owns the session for as long as it runs, which can be
+        # hours. A poll queued behind it would hold its caller, and a fleet
+        # slot, all that time, so polls are skipped until it is done.
+        if self.is_uploading():
+            return
+
+        if self._push:
+            connected = await self._update_push()
+        else:
+            connected = await self._update_poll()
+
+        if connected:
+            self._disconnected = 0
+
+            if self._status != Shui3dPrinterConnectionStatus.Connected:
+                self._status = Shui3dPrinterConnectionStatus.Connected
+                self._stale = False
+                # The card may have been swapped while the printer was away
+                self.invalidate_catalog()
+
+            # Listeners waiting on readings see every poll, not only the
+            # changes of the connection
+            self.notify()
+
+            return
+
+        # The connection already retried a broken session once, a failure
+        # here means the printer is not reachable right now.
+        self._mark_disconnected()
+        self._start_reconnect()
+
+    def _mark_disconnected(self):
+        self._disconnected += 1
+
+        if not self._stale and not self.is_connected():
+            return
+
+        self._status = Shui3dPrinterConnectionStatus.Disconnected
+        self._stale = False
+        self._print_status_diff = 0
+        self._print_status = Shui3dPrintStatus.Idle
+        self._bed_history.clear()
+        self._extruder_history.clear()
+        self._print_estimator.reset()
+        self.notify()
+
+    def _on_session_lost(self):
+        # Try to get the session back right away, the printer only shows as
+        # disconnected if that fails, so a dropped idle session does not flicker.
+        if self._status == Shui3dPrinterConnectionStatus.Connected:
+            self._start_reconnect()
+
+    def _start_reconnect(self):
+        if self._closed or self._reconnect_task is not None:
+            return
+
+        self._reconnect_task = asyncio.get_running_loop().create_task(
+            self._reconnect()
+        )
+
+    async def _reconnect(self):
+        delay = 0
+
+        try:
+            while not self._closed:
+                if delay:
+                    # Printers that went away together, with a power strip or
+                    # a restart, do not all come knocking at the same moments
+                    await asyncio.sleep(Shui3dPrinterFleet.jitter(delay))
+
+                if self._fleet is None:
+                    reconnected = await self._reconnect_attempt()
+                else:
+                    reconnected = await self._fleet.run(self._reconnect_attempt)
+
+                if reconnected:
+                    return
+
+                delay = min(
+                    max(delay * 2, Shui3dPrinter.RECONNECT_MIN_DELAY),
+                    Shui3dPrinter.RECONNECT_MAX_DELAY,
+                )
+        finally:
+            if self._reconnect_task is asyncio.current_task():
+                self._reconnect_task = None
+
+    async def _reconnect_attempt(self) -> bool:
+        # Opening a session is enough to tell the printer is there, a full
+        # update is only due when coming back or to restart the auto reports
+        # of the new session.
+        opened = await self._queue.run(
+            lambda connection: connection.open(), Shui3dCommandPriority.POLL
+        )
+
+        if opened is not True:
+            self._mark_disconnected()
+            return False
+
+        if self._push or not self.is_connected():
+            await self.ensure_update()
+
+        return self.is_connected()
+
+    def is_reconnecting(self) -> bool:
+        return self._reconnect_task is not None
+
+    async def _update_poll(self) -> bool:
+        responses = await self._queue.submit(
+            [GCode.SD_PRINT_STATUS, GCode.TEMPERATURES] + self._telemetry_gcodes(),
+            Shui3dCommandPriority.POLL,
+        )
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return False
+
+        self.update_from([line for lines in responses for line in lines])
+
+        return True
+
+    def is_streaming(self) -> bool:
+        return (
+            self._push
+            and self._connection.is_open()
+            and self._push_session == self._connection.session()
+            and time.monotonic() - self._last_report < Shui3dPrinter.PUSH_STALE_AFTER
+        )
+
+    async def _update_push(self) -> bool:
+        # While reports keep flowing only the optional values, which are never
+        # auto reported, have to be asked for. Otherwise (re)enable auto
+        # reporting on the current session and ask for them in the same batch.
+        telemetry = self._telemetry_gcodes()
+
+        if self.is_streaming():
+            return not telemetry or await self._update_telemetry(telemetry)
+
+        responses = await self._queue.submit(
+            [
+                f"{GCode.AUTO_REPORT_TEMPERATURES} S{Shui3dPrinter.PUSH_TEMPERATURES_INTERVAL}",
+                f"{GCode.SD_PRINT_STATUS} S{Shui3dPrinter.PUSH_SD_STATUS_INTERVAL}",
+            ]
+            + telemetry,
+            Shui3dCommandPriority.POLL,
+        )
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return False
+
+        self.update_values_from([line for lines in responses[2:] for line in lines])
+
+        if any("Unknown command" in line for lines in responses[:2] for line in lines):
+            self.log("Firmware does not support auto reports, falling back to polling")
+            self._push = False
+            self._connection.set_data_listener(self._on_card_event)
+            return await self._update_poll()
+
+        self._push_session = self._connection.session()
+        self._last_report = time.monotonic()
+
+        return True
+
+    async def _update_telemetry(self, gcodes: List[str]) -> bool:
+        responses = await self._queue.submit(gcodes, Shui3dCommandPriority.POLL)
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return False
+
+        self.update_values_from([line for lines in responses for line in lines])
+
+        return True
+
+    def _on_card_event(self, data: bytearray, start: int, end: int):
+        # Polling still has to notice a card swap, which the firmware only
+        # announces unasked, most likely between two polls. Lines without
+        # "SD " or "Card" can not be one and are not parsed at all.
+        if data.find(b"SD ", start, end) < 0 and data.find(b"Card", start, end) < 0:
+            return
+
+        try:
+            report = Shui3dReportParser.parse_range(data, start, end)
+        except Exception:
+            self._connection.metrics().parse_errors += 1
+            return
+
+        if report.sd_card_changed:
+            self.invalidate_catalog()
+
+    def _on_report(self, data: bytearray, start: int, end: int):
+        self._last_report = time.monotonic()
+
+        try:
+            report = Shui3dReportParser.parse_range(data, start, end)
+        except Exception as e:
+            self._connection.metrics().parse_errors += 1
+            self.log(f"Report parsing failed with: {type(e).__name__}")
+            return
+
+        self._push_busy = self._push_busy or report.busy
+
+        if report.has_sd_status():
+            # An SD report closes one reporting period, busy seen during
+            # the period drives the status the same way a poll would.
+            report.busy = self._push_busy
+            self._push_busy = False
+            self.apply_report(report)
+        elif report.has_temperatures():
+            self.update_values_from_report(report)
+        else:
+            return
+
+        if self._status == Shui3dPrinterConnectionStatus.Connected:
+            self.notify()
+
+    async def ensure_update(self):
+        # Every caller awaits the same in-flight update instead of starting its own
+        if self._update_task is None:
+            self._update_task = asyncio.ensure_future(self._run_update())
+
+        await asyncio.shield(self._update_task)
+
+    async def _run_update(self):
+        try:
+            await self.update()
+        except Exception as e:
+            self.log(f"Update failed with: {type(e).__name__}")
+        finally:
+            self._update_task = None
+
+    async def _exec_with_state_update(
+        self, gcode: str, priority: int, key: str | None
+    ) -> bool:
+        responses = await self._queue.submit([gcode], priority, key)
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return False
+
+        self.update_values_from(responses[0])
+
+        return not Shui3dPrinter._is_failure(responses[0])
+
+    async def exec_with_state_update(
+        self,
+        gcode: str,
+        priority: int = Shui3dCommandPriority.USER,
+        key: str | None = None,
+    ) -> bool:
+        return await self._exec_with_state_update(gcode, priority, key)
 
     def update_from(self, lines: List[str]):
-        self.update_values_from(lines)
+        try:
+            self.apply_report(Shui3dReportParser.parse_lines(lines))
+        except Exception as e:
+            self._connection.metrics().parse_errors += 1
+            self.log(f"Update failed with: {e}")
+
+    def update_values_from(self, lines: List[str]):
+        try:
+            self.update_values_from_report(Shui3dReportParser.parse_lines(lines))
+        except Exception as e:
+            self._connection.metrics().parse_errors += 1
+            self.log(f"Update failed with: {e}")
+
+    def apply_report(self, report: Shui3dReport):
+        self.update_values_from_report(report)
 
         try:
-            self.update_statues_from(lines)
+            self.update_statues_from(report)
         except Exception as e:
+            self._connection.metrics().parse_errors += 1
             self.log(f"Progress update failed with: {type(e).__name__}")
 
-    def update_values_from(self, lines: List[str]):
-        for line in lines:
-            # self.log("Line: " + line)
-            try:
-                self.parse_and_update_values(line)
-            except Exception as e:
-                self.log(f"Update failed with: {e}")
-
-    def parse_and_update_values(self, line: str):
-        parts: list[str] = line.split()
-
-        for i in range(len(parts)):
-            part: str = parts[i]
-            if part.startswith("T0:"):
-                self._extruder_temp = float(part.split(":")[1])
-                self._target_extruder_temp = float(parts[i + 1].split("/")[-1])
-            if part.startswith("B:"):
-                self._bed_temp = float(part.split(":")[1])
-                self._target_bed_temp = float(parts[i + 1].split("/")[-1])
-
-    def update_statues_from(self, lines: List[str]):
-        for line in lines:
-            if "SD printing byte" in line:
-                nm = line.split()[-1].split("/")
-                self._print_progress = float(nm[0]) / float(nm[1]) * 100
-                self._print_status = Shui3dPrintStatus.Printing
-                self._print_status_diff = 0
-                return
+    def update_values_from_report(self, report: Shui3dReport):
+        now = time.monotonic()
 
-        for line in lines:
-            if "busy" in line:
-                if self._print_status == Shui3dPrintStatus.Busy:
-                    self._print_status_diff = 0
-                    return
+        if report.extruder_temp is not None:
+            self._extruder_temp = report.extruder_temp
+            self._target_extruder_temp = report.target_extruder_temp
+            self._extruder_history.add(report.extruder_temp, now)
 
-                if self._print_status == Shui3dPrintStatus.Idle:
-                    self._print_status = Shui3dPrintStatus.Busy
-                    self._print_status_diff = 0
-                    return
+        if report.bed_temp is not None:
+            self._bed_temp = report.bed_temp
+            self._target_bed_temp = report.target_bed_temp
+            self._bed_history.add(report.bed_temp, now)
 
-                if self._print_status_diff >= Shui3dPrinter.DIFF_TO_CHANGE:
-                    self._print_status = Shui3dPrintStatus.Busy
-                    self._print_status_diff = 0
-                else:
-                    self._print_status_diff += 1
+        if report.position is not None:
+            self._position = report.position
+
+        if report.feedrate is not None:
+            self._feedrate = report.feedrate
+
+        if report.flow is not None:
+            self._flow = report.flow
+
+        if report.sd_card_changed:
+            self.invalidate_catalog()
+
+    def update_statues_from(self, report: Shui3dReport):
+        if report.sd_idle and report.sd_total is None:
+            self._print_estimator.reset()
+
+        if report.sd_total is not None:
+            self._print_estimator.add(
+                report.sd_printed, report.sd_total, time.monotonic()
+            )
+            self._print_progress = report.sd_printed / report.sd_total * 100
+            self._print_status = Shui3dPrintStatus.Printing
+            self._print_status_diff = 0
+            return
+
+        if report.busy:
+            if self._print_status == Shui3dPrintStatus.Busy:
+                self._print_status_diff = 0
+                return
 
+            if self._print_status == Shui3dPrintStatus.Idle:
+                self._print_status = Shui3dPrintStatus.Busy
+                self._print_status_diff = 0
                 return
 
+            if self._print_status_diff >= Shui3dPrinter.DIFF_TO_CHANGE:
+                self._print_status = Shui3dPrintStatus.Busy
+                self._print_status_diff = 0
+            else:
+                self._print_status_diff += 1
+
+            return
+
         if self._print_status == Shui3dPrintStatus.Idle:
             self._print_status_diff = 0
             return
@@ -252,52 +1619,429 @@ class Shui3dPrinter:
     def is_connected(self) -> bool:
         return self._status == Shui3dPrinterConnectionStatus.Connected
 
-    def bed_temp(self):
-        return (
-            self._bed_temp
-            if self._status == Shui3dPrinterConnectionStatus.Connected
-            else None
+    def is_stale(self) -> bool:
+        return self._stale
+
+    def _has_values(self) -> bool:
+        # Live values, or the restored ones until the printer answered
+        return self._status == Shui3dPrinterConnectionStatus.Connected or self._stale
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last known state, compact enough to be saved after every update."""
+        return {
+            "bed": [self._bed_temp, self._target_bed_temp],
+            "extruder": [self._extruder_temp, self._target_extruder_temp],
+            "position": self._position,
+            "print_status": self._print_status.name,
+            "print_progress": round(self._print_progress, 2),
+            "saved": round(time.time()),
+        }
+
+    def restore(self, snapshot: Dict[str, Any]):
+        # Shown as stale until the first update, whatever its outcome
+        try:
+            (self._bed_temp, self._target_bed_temp) = snapshot["bed"]
+            (self._extruder_temp, self._target_extruder_temp) = snapshot["extruder"]
+            self._position = snapshot["position"]
+            self._print_status = Shui3dPrintStatus[snapshot["print_status"]]
+            self._print_progress = snapshot["print_progress"]
+        except (KeyError, TypeError, ValueError) as e:
+            self.log(f"Ignoring the saved state: {type(e).__name__}")
+            return
+
+        self._stale = True
+
+    def failures(self) -> int:
+        return self._disconnected
+
+    def metrics(self) -> Shui3dConnectionMetrics:
+        return self._connection.metrics()
+
+    def diagnostics(self) -> dict:
+        return {
+            "status": self.status(),
+            "print_status": str(self._print_status).split(".")[1],
+            "failures": self._disconnected,
+            "reconnecting": self.is_reconnecting(),
+            "stale": self._stale,
+            "sd_files": None if self._catalog is None else len(self._catalog),
+            "telemetry": sorted(self._telemetry),
+            "push": self._push,
+            "streaming": self.is_streaming(),
+            "session": self._connection.session(),
+            "session_open": self._connection.is_open(),
+            "banner": self._connection.banner(),
+            "receive_overflows": self._connection.receive_overflows(),
+            "capture": None
+            if self._connection.capture() is None
+            else self._connection.capture().path(),
+            "metrics": self.metrics().as_dict(),
+            "upload": None
+            if self._upload is None
+            else {
+                "name": self._upload.name,
+                "size": self._upload.size,
+                "position": self._upload.position,
+                "running": self._upload.is_running(),
+                "succeeded": self._upload.succeeded,
+                "rate": self._upload.rate(),
+            },
+        }
+
+    def is_heating(self) -> bool:
+        return any(
+            target > 0 and abs(target - temp) > Shui3dPrinter.HEATING_TOLERANCE
+            for (temp, target) in (
+                (self._bed_temp, self._target_bed_temp),
+                (self._extruder_temp, self._target_extruder_temp),
+            )
         )
 
+    def bed_temp(self):
+        return self._bed_temp if self._has_values() else None
+
     def target_bed_temp(self):
-        return (
-            self._target_bed_temp
-            if self._status == Shui3dPrinterConnectionStatus.Connected
-            else None
-        )
+        return self._target_bed_temp if self._has_values() else None
 
     async def set_target_bed_temp(self, temp: float):
-        await self.exec_with_state_update(f"M140 S{temp}")
+        await self.exec_with_state_update(
+            f"{GCode.SET_BED_TEMP} S{temp}", key=GCode.SET_BED_TEMP
+        )
 
     async def set_target_extruder_temp(self, temp: float):
-        await self.exec_with_state_update(f"M104 T0 S{temp}")
+        await self.exec_with_state_update(
+            f"{GCode.SET_EXTRUDER_TEMP} T0 S{temp}", key=GCode.SET_EXTRUDER_TEMP
+        )
 
     def extruder_temp(self):
-        return (
-            self._extruder_temp
-            if self._status == Shui3dPrinterConnectionStatus.Connected
-            else None
-        )
+        return self._extruder_temp if self._has_values() else None
 
     def target_extruder_temp(self):
-        return (
-            self._target_extruder_temp
-            if self._status == Shui3dPrinterConnectionStatus.Connected
-            else None
-        )
+        return self._target_extruder_temp if self._has_values() else None
 
-    def print_progress(self):
+    async def set_targets(
+        self, bed: float | None = None, extruder: float | None = None
+    ) -> bool:
+        # Both setpoints go out in one batch, a heater left at None is untouched
+        gcodes = []
+
+        if bed is not None:
+            gcodes.append(f"{GCode.SET_BED_TEMP} S{bed}")
+
+        if extruder is not None:
+            gcodes.append(f"{GCode.SET_EXTRUDER_TEMP} T0 S{extruder}")
+
+        responses = await self._queue.submit(gcodes, Shui3dCommandPriority.USER)
+
+        if isinstance(responses, Shui3dPrinterConnection.CanNotConnect):
+            return False
+
+        for lines in responses:
+            self.update_values_from(lines)
+
+        return not any(Shui3dPrinter._is_failure(lines) for lines in responses)
+
+    async def preheat(
+        self,
+        bed: float | None = None,
+        extruder: float | None = None,
+        steps: int = 1,
+        tolerance: float = HEATING_TOLERANCE,
+        hold: float = PREHEAT_HOLD,
+        timeout: float = PREHEAT_TIMEOUT,
+    ) -> bool:
+        """Heat to the targets and wait until both held them for hold seconds.
+
+        With several steps the targets ramp up from the current temperatures,
+        each step waits for its targets to be reached before the next is set.
+        A target of 0 turns the heater off without waiting for it to cool.
+        """
+        changed = asyncio.Event()
+        remove = self.add_listener(changed.set)
+
+        try:
+            await asyncio.wait_for(
+                self._preheat(bed, extruder, steps, tolerance, hold, changed), timeout
+            )
+            return True
+        except asyncio.TimeoutError:
+            self.log(f"Preheat did not settle within {timeout}s")
+            return False
+        except ConnectionError as e:
+            self.log(f"Preheat failed, {e}")
+            return False
+        finally:
+            remove()
+
+    async def _preheat(
+        self,
+        bed: float | None,
+        extruder: float | None,
+        steps: int,
+        tolerance: float,
+        hold: float,
+        changed: asyncio.Event,
+    ):
+        bed_start = self.bed_temp()
+        extruder_start = self.extruder_temp()
+
+        for step in range(1, steps + 1):
+            bed_step = Shui3dPrinter._ramp(bed_start, bed, step, steps)
+            extruder_step = Shui3dPrinter._ramp(extruder_start, extruder, step, steps)
+
+            if not await self.set_targets(bed_step, extruder_step):
+                raise ConnectionError("can not set the targets")
+
+            # Reading the new targets back switches polling to the heating pace
+            await self.ensure_update()
+
+            await self._settle(
+                [
+                    (getter, target)
+                    for getter, target in (
+                        (self.bed_temp, bed_step),
+                        (self.extruder_temp, extruder_step),
+                    )
+                    if target
+                ],
+                tolerance,
+                hold if step == steps else 0,
+                changed,
+            )
+
+    @staticmethod
+    def _ramp(
+        start: float | None, target: float | None, step: int, steps: int
+    ) -> float | None:
+        if not target or start is None or step == steps:
+            return target
+
+        return round(start + (target - start) * step / steps, 1)
+
+    async def _settle(
+        self,
+        targets: List[Tuple[Callable[[], float | None], float]],
+        tolerance: float,
+        hold: float,
+        changed: asyncio.Event,
+    ):
+        # Every poll and every pushed report notifies the listeners, so this
+        # wakes up with each new reading and sleeps in between.
+        loop = asyncio.get_running_loop()
+        since: float | None = None
+
+        while True:
+            # Losing the printer notifies as well, its readings are gone then
+            if not self.is_connected():
+                raise ConnectionError("the printer disconnected")
+
+            temps = [(getter(), target) for getter, target in targets]
+
+            if all(
+                temp is not None and abs(temp - target) <= tolerance
+                for temp, target in temps
+            ):
+                since = loop.time() if since is None else since
+            else:
+                since = None
+
+            if since is not None and loop.time() - since >= hold:
+                return
+
+            changed.clear()
+            remaining = None if since is None else since + hold - loop.time()
+
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _heating_rate(self, history: Shui3dTemperatureHistory):
+        if self._status != Shui3dPrinterConnectionStatus.Connected:
+            return None
+
+        rate = history.rate()
+
+        return None if rate is None else round(rate * 60, 2)
+
+    def _stability(self, history: Shui3dTemperatureHistory):
+        if self._status != Shui3dPrinterConnectionStatus.Connected:
+            return None
+
+        stability = history.stability()
+
+        return None if stability is None else round(stability, 2)
+
+    def _time_to_target(self, history: Shui3dTemperatureHistory, target: float):
         if self._status != Shui3dPrinterConnectionStatus.Connected:
             return None
 
+        seconds = history.time_to_target(target, Shui3dPrinter.HEATING_TOLERANCE)
+
+        return None if seconds is None else round(seconds)
+
+    def bed_heating_rate(self):
+        return self._heating_rate(self._bed_history)
+
+    def bed_temp_stability(self):
+        return self._stability(self._bed_history)
+
+    def bed_time_to_target(self):
+        return self._time_to_target(self._bed_history, self._target_bed_temp)
+
+    def extruder_heating_rate(self):
+        return self._heating_rate(self._extruder_history)
+
+    def extruder_temp_stability(self):
+        return self._stability(self._extruder_history)
+
+    def extruder_time_to_target(self):
+        return self._time_to_target(self._extruder_history, self._target_extruder_temp)
+
+    def position(self):
+        return self._position if self._has_values() else None
+
+    def feedrate(self):
+        return self._feedrate if self._has_values() else None
+
+    def flow(self):
+        return self._flow if self._has_values() else None
+
+    def print_progress(self):
+        if not self._has_values():
+            return None
+
         if self._print_status != Shui3dPrintStatus.Printing:
             return None
 
         return self._print_progress
 
-    def print_status(self):
+    def _is_printing(self) -> bool:
         return (
-            str(self._print_status).split(".")[1]
-            if self._status == Shui3dPrinterConnectionStatus.Connected
-            else None
+            self._status == Shui3dPrinterConnectionStatus.Connected
+            and self._print_status == Shui3dPrintStatus.Printing
+        )
+
+    def print_time_remaining(self):
+        if not self._is_printing():
+            return None
+
+        remaining = self._print_estimator.remaining()
+
+        return None if remaining is None else round(remaining)
+
+    def print_finish_time(self):
+        remaining = self.print_time_remaining()
+
+        if remaining is None:
+            return None
+
+        # Minute resolution, so the moving clock alone does not change the state
+        finish = datetime.now(timezone.utc) + timedelta(seconds=remaining)
+
+        return finish.replace(second=0, microsecond=0)
+
+    def print_throughput(self):
+        if not self._is_printing():
+            return None
+
+        if self._print_estimator.is_paused():
+            return 0
+
+        rate = self._print_estimator.rate()
+
+        return None if rate is None else round(rate, 1)
+
+    def is_uploading(self) -> bool:
+        return self._upload is not None and self._upload.is_running()
+
+    def upload_progress(self):
+        if self._upload is None:
+            return None
+
+        return self._upload.percent()
+
+    def upload_rate(self):
+        if self._upload is None:
+            return None
+
+        return self._upload.rate()
+
+    def print_status(self):
+        return str(self._print_status).split(".")[1] if self._has_values() else None
+
+
+class Shui3dPollScheduler:
+    ACTIVE_INTERVAL = 5
+    IDLE_INTERVAL = 60
+    # A streaming update does no I/O, it only checks that reports still arrive
+    STREAMING_INTERVAL = Shui3dPrinter.PUSH_STALE_AFTER
+    OFFLINE_INTERVAL = 600
+
+    def next_interval(self, printer: Shui3dPrinter) -> float:
+        if not printer.is_connected():
+            # The printer reconnects itself with backoff and reports back once
+            # it is there again, polling would only add connect attempts.
+            return Shui3dPollScheduler.OFFLINE_INTERVAL
+
+        if printer.is_streaming():
+            return Shui3dPollScheduler.STREAMING_INTERVAL
+
+        if printer.print_status() != Shui3dPrintStatus.Idle.name or printer.is_heating():
+            return Shui3dPollScheduler.ACTIVE_INTERVAL
+
+        return Shui3dPollScheduler.IDLE_INTERVAL
+
+
+class Shui3dPrinterFleet:
+    MAX_CONCURRENT_UPDATES = 8
+    JITTER = 0.2
+    # Seconds all first updates after a start may take together
+    STARTUP_BUDGET = 10
+
+    _semaphore: asyncio.Semaphore
+    _startup_deadline: float | None = None
+    _background: Set[asyncio.Task]
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+        self._semaphore = asyncio.Semaphore(max_concurrent_updates)
+        self._background = set()
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        # Bounds how many printers of the fleet talk to the network at once,
+        # so a tick shared by many printers does not turn into a burst.
+        async with self._semaphore:
+            return await call()
+
+    async def update(self, printer: Shui3dPrinter):
+        await self.run(printer.ensure_update)
+
+    async def startup_update(self, printer: Shui3dPrinter) -> bool:
+        # The budget starts with the first printer of a start, a printer set
+        # up once it ran out (added, reloaded, retried) opens a new one. A
+        # printer still not done when the budget runs out is left to finish in
+        # the background and reports through its listeners instead of holding
+        # anything up.
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        if self._startup_deadline is None or now >= self._startup_deadline:
+            self._startup_deadline = now + Shui3dPrinterFleet.STARTUP_BUDGET
+
+        task = loop.create_task(self.update(printer))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(task), self._startup_deadline - now)
+        except asyncio.TimeoutError:
+            printer.log("Startup budget spent, first update left to the background")
+            return False
+
+        return True
+
+    @staticmethod
+    def jitter(interval: float) -> float:
+        return interval * random.uniform(
+            1 - Shui3dPrinterFleet.JITTER, 1 + Shui3dPrinterFleet.JITTER
         )
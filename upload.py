@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import AsyncIterator
+
+
+class Shui3dUploadProgress:
+    name: str
+    size: int
+    position: int = 0
+    started: float
+    finished: float | None = None
+    succeeded: bool | None = None
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.started = time.monotonic()
+
+    def finish(self, succeeded: bool):
+        self.finished = time.monotonic()
+        self.succeeded = succeeded
+
+    def is_running(self) -> bool:
+        return self.finished is None
+
+    def percent(self) -> float:
+        if not self.size:
+            return 100.0 if self.succeeded else 0.0
+
+        return round(100.0 * self.position / self.size, 1)
+
+    def rate(self) -> float:
+        """File bytes per second since the upload started."""
+        elapsed = (self.finished or time.monotonic()) - self.started
+
+        if elapsed <= 0:
+            return 0.0
+
+        return round(self.position / elapsed)
+
+
+async def read_gcode_lines(
+    path: str, progress: Shui3dUploadProgress, chunk_size: int
+) -> AsyncIterator[str]:
+    # The file is read chunk by chunk off the event loop, so memory stays at
+    # one chunk whatever the size of the file. Comments and blank lines never
+    # reach the printer, the position counts the file bytes consumed.
+    loop = asyncio.get_running_loop()
+    file = await loop.run_in_executor(None, open, path, "rb")
+
+    try:
+        tail = b""
+
+        while True:
+            chunk = await loop.run_in_executor(None, file.read, chunk_size)
+
+            if not chunk:
+                break
+
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+
+            for raw in lines:
+                progress.position += len(raw) + 1
+                line = raw.split(b";", 1)[0].strip()
+
+                if line:
+                    yield line.decode(errors="replace")
+
+        progress.position += len(tail)
+        line = tail.split(b";", 1)[0].strip()
+
+        if line:
+            yield line.decode(errors="replace")
+    finally:
+        await loop.run_in_executor(None, file.close)